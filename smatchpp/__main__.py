@@ -60,15 +60,74 @@ def build_arg_parser():
             , type=str
             , default="ilp"
             , nargs='?'
-            , choices=["ilp_backed", "ilp", "lp", "hillclimber", "dummy", "rilp"]
+            , choices=["auto", "ilp_backed", "ilp", "ilp_certified", "ilp_sparse", "ilp_aggregated", "ilp_integral", "ilp_highs", "ilp_pruned", "ilp_symmetry", "ilp_decomposed", "lp", "hillclimber", "hillclimber_vectorized", "assignment", "enumeration", "tree_dp", "tabu", "portfolio", "dummy", "rilp"]
             , help='alignment solver type: \
+                        auto: select solver per component by size and structure \
                         ilp_backed: ilp with back up \
                         ilp: integer linear program \
+                        ilp_certified: hillclimber, and ilp only if hillclimber is not provably optimal \
+                        ilp_sparse: integer linear program with variables only for matching pairs \
+                        ilp_aggregated: ilp with aggregated (tighter) linking constraints \
+                        ilp_integral: ilp with objective scaled to integers if possible (stops at gap < 1) \
+                        ilp_highs: integer linear program with HiGHS (scipy) instead of CBC \
+                        ilp_pruned: ilp on top-k candidate pairs per node, with bound for pruning loss \
+                        ilp_symmetry: ilp with interchangeable nodes merged \
+                        ilp_decomposed: integer linear program on independent sub-problems \
                         lp: relaxed integer linear program \
                         hillclimber: hillclimber \
+                        hillclimber_vectorized: hillclimber on numpy arrays (faster for large graphs) \
+                        assignment: linear assignment (optimal only if no structural matches) \
+                        enumeration: exact enumeration for small graphs (ilp for larger) \
+                        tree_dp: branch and bound with dynamic programming bounds, faster than ilp only for similar graphs (ilp if it does not finish) \
+                        tabu: tabu search (heuristic for large graphs) \
+                        portfolio: ilp, lp and hillclimber in parallel processes \
                         dummy: dummy alignment \
-                        rilp: relaxed integer linear program (experimental)')
+                        rilp: lagrangian relaxation with hillclimber (anytime, upper bound)')
      
+    parser.add_argument('-seed'
+            , type=int
+            , default=None
+            , nargs='?'
+            , help='seed of the randomized solvers (hillclimber, hillclimber_vectorized, tabu), \
+                    makes their alignments reproducible')
+
+    parser.add_argument('-n_jobs'
+            , type=int
+            , default=1
+            , nargs='?'
+            , help='number of processes that run hill-climbing restarts in parallel \
+                    (hillclimber, hillclimber_vectorized)')
+
+    parser.add_argument('-patience'
+            , type=int
+            , default=None
+            , nargs='?'
+            , help='stop hill-climbing after this many restarts in a row without \
+                    improvement (hillclimber, hillclimber_vectorized)')
+
+    parser.add_argument('-time_budget'
+            , type=float
+            , default=None
+            , nargs='?'
+            , help='total seconds for solving all alignments (for solvers with a time limit), \
+                    time limits are scheduled per graph pair, and pairs without \
+                    proven optimal alignment are revisited if time is left')
+
+    parser.add_argument('-batch_size'
+            , type=int
+            , default=None
+            , nargs='?'
+            , help='solve the alignment problems of this many graph pairs with one solver call \
+                    (useful for many small graphs with ilp_highs, only for score_dimension main \
+                    and without time budget)')
+
+    parser.add_argument('-alignment_cache_size'
+            , type=int
+            , default=0
+            , nargs='?'
+            , help='memoize solutions of up to this many alignment problems, \
+                    useful if a corpus contains duplicate graph pairs (0: no cache)')
+
     parser.add_argument('--bootstrap'
             , action='store_true'
             , help='obtain confidence intervals, only possible if -score_type not pairwise')
@@ -78,6 +137,11 @@ def build_arg_parser():
             , help='shrinks alignment search space by removing  \
                     variables that are identified by a concept')
     
+    parser.add_argument('--interned'
+            , action='store_true'
+            , help='intern graphs after standardization (int arrays instead of strings), \
+                    saves memory and time on large corpora, only for score_dimension main')
+
     parser.add_argument('--remove_duplicates'
             , action='store_true'
             , help='enable for removing duplicate triples, which makes sense for most cases')
@@ -127,7 +191,9 @@ if __name__ == "__main__":
     triplematcher = score.IDTripleMatcher()
     logger.info("4a. triple matcher loaded")
     
-    alignmentsolver = solvers.get_solver(args.solver)
+    alignmentsolver = solvers.get_solver(args.solver, seed=args.seed, n_jobs=args.n_jobs, patience=args.patience)
+    if args.alignment_cache_size > 0:
+        alignmentsolver = solvers.CachedSolver(alignmentsolver, maxsize=args.alignment_cache_size)
     logger.info("4b. alignment solver loaded")
     
     graph_aligner = align.GraphAligner(triplematcher, alignmentsolver) 
@@ -161,11 +227,12 @@ if __name__ == "__main__":
                         graph_pair_preparer=graph_pair_preparer, triplematcher=triplematcher,
                         alignmentsolver=alignmentsolver, graph_aligner=graph_aligner, 
                         graph_scorer=graph_scorer, printer=printer, score_dimension=args.score_dimension, 
-                        subgraph_extractor=subgraph_extractor)
+                        subgraph_extractor=subgraph_extractor, interned=args.interned)
 
     if args.score_type == "micromacro":
         
-        match_dict, status = SMATCHPP.process_corpus(graphs, graphs2)
+        match_dict, status = SMATCHPP.process_corpus(graphs, graphs2, time_budget=args.time_budget, 
+                                                    batch_size=args.batch_size)
         
         #get micro scores
         printer = eval_statistics.ResultPrinter(score_type="micro", do_bootstrap=args.bootstrap, output_format=args.output_format)
@@ -192,11 +259,13 @@ if __name__ == "__main__":
             printer.print_all(final_result_dict_macro)
 
     elif args.score_type == "pairwise":
-        final_result_list, status = SMATCHPP.score_corpus(graphs, graphs2)
+        final_result_list, status = SMATCHPP.score_corpus(graphs, graphs2, time_budget=args.time_budget, 
+                                                    batch_size=args.batch_size)
         for singlepair in final_result_list:
             SMATCHPP.printer.print_all(singlepair, jsonindent=0)
     else:
-        final_result_dic, status = SMATCHPP.score_corpus(graphs, graphs2)
+        final_result_dic, status = SMATCHPP.score_corpus(graphs, graphs2, time_budget=args.time_budget, 
+                                                    batch_size=args.batch_size)
         SMATCHPP.printer.print_all(final_result_dic)
     
 
@@ -212,3 +281,10 @@ if __name__ == "__main__":
         Optimal status, lower & upper bound: {}\
         Pairs that do not have ensured optimal solution: {}".format(status_sum, non_optimal))
     
+    if args.alignment_cache_size > 0:
+        logger.info("alignment cache hit rate: {:.3f}".format(alignmentsolver.hit_rate))
+    
+    if args.solver == "auto":
+        autosolver = alignmentsolver.solver if args.alignment_cache_size > 0 else alignmentsolver
+        logger.info("solver routes: {}".format(autosolver.route_summary()))
+    
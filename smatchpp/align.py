@@ -23,12 +23,51 @@ class GraphAligner:
 
         triples1 = Counter([tr for tr in triples1 if (tr[0] in var1 and tr[2] in var1)])
         triples2 = Counter([tr for tr in triples2 if (tr[0] in var2 and tr[2] in var2)])
+        
+        if self.triplematcher.exact:
+            return self._make_binary_match_dict_indexed(triples1, triples2, var_index)
+
+        # relations are matched once per pair of distinct relations, in one batch
+        relation_triples1 = {}
+        for triple in triples1:
+            relation_triples1.setdefault(triple[1], []).append(triple)
+        relation_triples2 = {}
+        for triple_other in triples2:
+            relation_triples2.setdefault(triple_other[1], []).append(triple_other)
+        relations1 = list(relation_triples1)
+        relations2 = list(relation_triples2)
+        matches = self.triplematcher.triplematch_batch([("xtmp", r, "ytmp") for r in relations1], 
+                                                       [("xtmp", r, "ytmp") for r in relations2])
+
+        for a, b in zip(*np.nonzero(matches > 0.0)):
+            for triple in relation_triples1[relations1[a]]:
+                s, r, t  = triple
+                i = var_index[s]
+                j = var_index[t]
+                for triple_other in relation_triples2[relations2[b]]:
+                    s_other, r_other, t_other  = triple_other
+                    i_other = var_index[s_other]
+                    j_other = var_index[t_other]
+                    match = float(matches[a, b]) * min(triples1[triple], triples2[triple_other])
+                    data[(i, i_other, j, j_other)] += match / 2
+                    data[(j, j_other, i, i_other)] += match / 2
+        
+        return data
+    
+    def _make_binary_match_dict_indexed(self, triples1, triples2, var_index):
+        # only triples with the same relation can match, so we group them by relation
+        
+        data = Counter()
+        
+        relation_triples2 = {}
+        for triple_other in triples2:
+            relation_triples2.setdefault(triple_other[1], []).append(triple_other)
 
         for triple in triples1:
             s, r, t  = triple
             i = var_index[s]
             j = var_index[t]
-            for triple_other in triples2:
+            for triple_other in relation_triples2.get(r, []):
                 s_other, r_other, t_other  = triple_other
                 i_other = var_index[s_other]
                 j_other = var_index[t_other]
@@ -46,27 +85,60 @@ class GraphAligner:
         triples1 = [tr for tr in triples1 if xor(tr[0] in var1, tr[2] in var1)]
         triples2 = [tr for tr in triples2 if xor(tr[0] in var2, tr[2] in var2)]
         
+        if self.triplematcher.exact:
+            return self._make_unary_match_dict_indexed(triples1, triples2, var_index)
+        
+        # triples with a variable as source are matched on (relation, target),
+        # triples with a variable as target on (source, relation), in one batch each
+        source_var_triples1 = [(var_index[s], ("xtmp", r, t)) for s, r, t in triples1 if s in var_index]
+        source_var_triples2 = [(var_index[s], ("xtmp", r, t)) for s, r, t in triples2 if s in var_index]
+        target_var_triples1 = [(var_index[t], (s, r, "ytmp")) for s, r, t in triples1 if s not in var_index]
+        target_var_triples2 = [(var_index[t], (s, r, "ytmp")) for s, r, t in triples2 if s not in var_index]
+        
+        for var_triples1, var_triples2 in [(source_var_triples1, source_var_triples2), 
+                                           (target_var_triples1, target_var_triples2)]:
+            if not var_triples1 or not var_triples2:
+                continue
+            matches = self.triplematcher.triplematch_batch([triple for _, triple in var_triples1], 
+                                                           [triple for _, triple in var_triples2])
+            for a, b in zip(*np.nonzero(matches > 0.0)):
+                data[(var_triples1[a][0], var_triples2[b][0])] += float(matches[a, b])
+        
+        return data
+    
+    def _make_unary_match_dict_indexed(self, triples1, triples2, var_index):
+        # a triple with a variable as source can only match a triple with a variable 
+        # as source and the same relation and target (same for variables as target), 
+        # so we group them by (relation, target) and (source, relation)
+        
+        data = Counter()
+        
+        source_var_triples2 = {}
+        target_var_triples2 = {}
+        for triple_other in triples2:
+            s_other, r_other, t_other  = triple_other
+            i_other = var_index.get(s_other)
+            if i_other is not None:
+                source_var_triples2.setdefault((r_other, t_other), []).append(i_other)
+                continue
+            j_other = var_index.get(t_other)
+            if j_other is not None:
+                target_var_triples2.setdefault((s_other, r_other), []).append(j_other)
+        
         for triple in triples1:
             s, r, t  = triple
             i = var_index.get(s)
             j = var_index.get(t)
-            for triple_other in triples2:
-                s_other, r_other, t_other  = triple_other
-                i_other = None
-                j_other = None
-                i_other = var_index.get(s_other)
-                if i_other is not None and i is not None:
-                    match = self.triplematcher.triplematch(("xtmp", r, t), ("xtmp", r_other, t_other))
+            if i is not None:
+                for i_other in source_var_triples2.get((r, t), []):
+                    match = self.triplematcher.triplematch(("xtmp", r, t), ("xtmp", r, t))
                     if match > 0.0:
                         data[(i, i_other)] += match
-                    continue
-                
-                j_other = var_index.get(t_other)
-                if j_other is not None and j is not None:
-                    match = self.triplematcher.triplematch((s, r, "ytmp"), (s_other, r_other, "ytmp"))
+            elif j is not None:
+                for j_other in target_var_triples2.get((s, r), []):
+                    match = self.triplematcher.triplematch((s, r, "ytmp"), (s, r, "ytmp"))
                     if match > 0.0:
                         data[(j, j_other)] += match
-                    continue
         
         return data
     
@@ -98,19 +170,13 @@ class GraphAligner:
             
         return out
 
-    def align(self, triples1, triples2, var1, var2):
-
-        logging.debug("starting alignment")
-        if not var1 or not var2:
-            return np.array([]), {}, (0, 0)
-
+    def _make_problem(self, triples1, triples2, var1, var2):
+        
         var_index = {}
         for i, v in enumerate(list(sorted(var1))):
             var_index[v] = i
         for i, v in enumerate(list(sorted(var2))):
             var_index[v] = i
-        if not var_index:
-            return None, []
         
         logging.debug("1. var index created: {}".format(var_index))
         unarymatch_dict, binarymatch_dict = self._compute_match_dicts(triples1, triples2, var1, var2, var_index)
@@ -118,8 +184,10 @@ class GraphAligner:
         logging.debug("2a. unary match_dict created {}; sum {}".format(unarymatch_dict, np.sum(unarymatch_dict)))
         logging.debug("2b. binary match_dict created {}; sum {}".format(binarymatch_dict, np.sum(binarymatch_dict)))
         V = max(len(var1), len(var2))
+        return var_index, unarymatch_dict, binarymatch_dict, V
+
+    def _log_alignment(self, alignmat, objective_value, objective_bound, var_index, triples1, triples2):
         
-        alignmat, objective_value, objective_bound = self.solver.solve(unarymatch_dict, binarymatch_dict, V)
         logging.debug("4. found alignment \n{}\n\
                 objective value: {}\n\
                 upper bound (if available):{}\n".format(alignmat, objective_value, objective_bound))
@@ -127,6 +195,52 @@ class GraphAligner:
         var_map = self._get_var_map(alignmat, var_index)
         logging.debug("5. output mapping {}".format(var_map))
         logging.debug("5. output mapping interpreted {}".format(self._interpretable_mapping(var_map, triples1, triples2)))
+        return None
+
+    def align(self, triples1, triples2, var1, var2):
+
+        logging.debug("starting alignment")
+        if not var1 or not var2:
+            return np.array([]), {}, (0, 0)
+
+        var_index, unarymatch_dict, binarymatch_dict, V = self._make_problem(triples1, triples2, var1, var2)
+        if not var_index:
+            return None, []
+        
+        alignmat, objective_value, objective_bound = self.solver.solve(unarymatch_dict, binarymatch_dict, V)
+        self._log_alignment(alignmat, objective_value, objective_bound, var_index, triples1, triples2)
         
         return alignmat, var_index, (objective_value, objective_bound)
 
+    def align_batch(self, graph_pairs):
+        """Aligns many graph pairs with one call of the solver
+
+            Args:
+                graph_pairs (list): (triples1, triples2, var1, var2) tuples
+
+            Returns:
+                list with (alignmat, var_index, (objective value, objective bound)) 
+                per graph pair, like align
+        """
+        
+        logging.debug("starting alignment of {} graph pairs".format(len(graph_pairs)))
+        results = [(np.array([]), {}, (0, 0))] * len(graph_pairs)
+        indices = []
+        var_indices = []
+        problems = []
+        for n, (triples1, triples2, var1, var2) in enumerate(graph_pairs):
+            if not var1 or not var2:
+                continue
+            var_index, unarymatch_dict, binarymatch_dict, V = self._make_problem(triples1, triples2, var1, var2)
+            indices.append(n)
+            var_indices.append(var_index)
+            problems.append((unarymatch_dict, binarymatch_dict, V))
+        
+        solutions = self.solver.solve_batch(problems)
+        for n, var_index, (alignmat, objective_value, objective_bound) in zip(indices, var_indices, solutions):
+            triples1, triples2, _, _ = graph_pairs[n]
+            self._log_alignment(alignmat, objective_value, objective_bound, var_index, triples1, triples2)
+            results[n] = (alignmat, var_index, (objective_value, objective_bound))
+        
+        return results
+
@@ -1,6 +1,8 @@
 import time
 import logging
+import numpy as np
 from smatchpp import util
+from smatchpp import interning
 
 logger = logging.getLogger("__main__")
 
@@ -9,7 +11,7 @@ class Smatchpp():
     def __init__(self, graph_reader=None, graph_writer=None, graph_standardizer=None, 
                     graph_pair_preparer=None, triplematcher=None, alignmentsolver=None, 
                     graph_aligner=None, graph_scorer=None, subgraph_extractor=None, 
-                    printer=None, score_dimension=None):
+                    printer=None, score_dimension=None, interned=False):
         
         self.graph_reader = graph_reader
         if not self.graph_reader:
@@ -61,15 +63,59 @@ class Smatchpp():
         self.score_dimension = score_dimension
         if not self.score_dimension:
             self.score_dimension = "main"
+        
+        # graphs can be interned after standardization, i.e., triples become int arrays 
+        # with flagged variables, this is supported for main scores with identical triple matching
+        self.interned = interned
+        if self.interned:
+            from smatchpp import score
+            if not isinstance(self.triplematcher, score.IDTripleMatcher):
+                raise ValueError("interned graphs can only be matched with IDTripleMatcher")
+            if self.score_dimension != "main":
+                raise ValueError("interned graphs are only supported for score dimension \"main\"")
+            self.symbol_table = interning.SymbolTable()
+            lossless_graph_compression = getattr(self.graph_pair_preparer, "lossless_graph_compression", False)
+            self.interned_pair_preparer = interning.InternedGraphPairPreparer(
+                    self.symbol_table, lossless_graph_compression=lossless_graph_compression)
 
         
-    def process_pair(self, string_g1, string_g2):
+    def _read_pair(self, string_g1, string_g2):
         g1 = self.graph_reader.string2graph(string_g1)
         g2 = self.graph_reader.string2graph(string_g2)
         logger.debug("graph pair loaded,\n\nG1: {}\n\nG2: {}".format(g1, g2))
         g1 = self.graph_standardizer.standardize(g1)
         g2 = self.graph_standardizer.standardize(g2)
         logger.debug("graph pair standardized,\n\nG1: {}\n\nG2: {}".format(g1, g2))
+        return g1, g2
+
+    def _intern_pair(self, g1, g2):
+        g1 = interning.intern_graph(g1, self.symbol_table)
+        g2 = interning.intern_graph(g2, self.symbol_table)
+        g1, g2 = self.interned_pair_preparer.prepare(g1, g2)
+        logger.debug("interned graph pair prepared, {} and {} triples".format(len(g1), len(g2)))
+        return g1, g2
+
+    @staticmethod
+    def _has_variables(g1, g2):
+        return g1.variables.shape[0] > 0 and g2.variables.shape[0] > 0
+
+    def _score_pair_interned(self, g1, g2, alignment, status):
+        match = {"main": interning.score_alignment(g1, g2, alignment)}
+        logger.debug("match computed: {}".format(match))
+        status = (status[0], min(len(g1), len(g2), status[1]))
+        return match, status, alignment
+
+    def process_pair(self, string_g1, string_g2):
+        g1, g2 = self._read_pair(string_g1, string_g2)
+        
+        if self.interned:
+            g1, g2 = self._intern_pair(g1, g2)
+            alignment, status = np.array([]), (0, 0)
+            if self._has_variables(g1, g2):
+                unarymatch_dict, binarymatch_dict, V = interning.get_match_dicts(g1, g2)
+                alignment, lowerbound, upperbound = self.graph_aligner.solver.solve(unarymatch_dict, binarymatch_dict, V)
+                status = (lowerbound, upperbound)
+            return self._score_pair_interned(g1, g2, alignment, status)
         
         if self.score_dimension == "main":
             g1, g2, v1, v2 = self.graph_pair_preparer.prepare_get_vars(g1, g2)
@@ -114,25 +160,149 @@ class Smatchpp():
         
         return match, status, alignment
     
+    def process_pairs(self, strings_g1, strings_g2):
+        """Processes many pairs of graphs, all alignment problems are solved 
+           with one call of the solver (only for score dimension "main")
+
+            Args:
+                strings_g1 (list): graphs
+                strings_g2 (list): other graphs
+            
+            Returns:
+                list with (match, status, alignment) per pair, like process_pair
+        """
+        
+        if self.interned:
+            return self._process_pairs_interned(strings_g1, strings_g2)
+        
+        prepared = []
+        for string_g1, string_g2 in zip(strings_g1, strings_g2):
+            g1, g2 = self._read_pair(string_g1, string_g2)
+            g1, g2, v1, v2 = self.graph_pair_preparer.prepare_get_vars(g1, g2)
+            logger.debug("graph pair fully prepared,\n\nG1: {}\n\nG2: {}\n\nVar G1: {}\n\nVar G2: {}".format(g1, g2, v1, v2))
+            prepared.append((g1, g2, v1, v2))
+        
+        results = []
+        for (g1, g2, _, _), (alignment, varindex, status) in zip(prepared, self.graph_aligner.align_batch(prepared)):
+            match = {"main": self.graph_scorer.score(g1, g2, alignment, varindex)}
+            logger.debug("match computed: {}".format(match))
+            status = (status[0], min(len(g1), len(g2), status[1]))
+            results.append((match, status, alignment))
+        
+        return results
+    
+    def _process_pairs_interned(self, strings_g1, strings_g2):
+        
+        prepared = []
+        problems = []
+        for string_g1, string_g2 in zip(strings_g1, strings_g2):
+            g1, g2 = self._intern_pair(*self._read_pair(string_g1, string_g2))
+            prepared.append((g1, g2))
+            if self._has_variables(g1, g2):
+                problems.append(interning.get_match_dicts(g1, g2))
+        
+        solutions = iter(self.graph_aligner.solver.solve_batch(problems))
+        results = []
+        for g1, g2 in prepared:
+            alignment, status = np.array([]), (0, 0)
+            if self._has_variables(g1, g2):
+                alignment, lowerbound, upperbound = next(solutions)
+                status = (lowerbound, upperbound)
+            results.append(self._score_pair_interned(g1, g2, alignment, status))
+        
+        return results
     
-    def process_corpus(self, graphs, graphs2):
+    def process_corpus(self, graphs, graphs2, time_budget=None, batch_size=None):
+        """Processes pairs of graphs
+
+            Args:
+                graphs (list): graphs
+                graphs2 (list): other graphs
+                time_budget (float): if given, total seconds for solving alignments. 
+                                    Time limits are scheduled per pair, and pairs 
+                                    without proven optimal alignment are revisited
+                                    if there is time left.
+                batch_size (int): if given, alignment problems of this many pairs are 
+                                  solved with one call of the solver (only for score 
+                                  dimension "main" and without time budget)
+            
+            Returns:
+                dictionary with match statistics and list with optimization status
+        """
+
+        if batch_size and self.score_dimension == "main" and time_budget is None:
+            return self._process_corpus_batched(graphs, graphs2, batch_size)
+
+        scheduler = None
+        solver = self.graph_aligner.solver
+        if time_budget is not None:
+            from smatchpp import solvers
+            scheduler = solvers.TimeBudgetScheduler(solver, time_budget)
+            scheduler.start(len(graphs))
+            self.graph_aligner.solver = scheduler
+        
+        status = []
+        match_dict = {}
+        seconds = time.time() 
+        try:
+            for i, g in enumerate(graphs):
+                if scheduler:
+                    scheduler.problems_left = len(graphs) - i
+                match, tmpstatus, _ = self.process_pair(g, graphs2[i])
+                status.append(tmpstatus)
+                util.append_dict(match_dict, match)
+                if (i + 1) % 100 == 0:
+                    logger.info("graph pairs processed: {}; time for last 100 pairs: {}".format(i + 1, time.time() - seconds))
+                    seconds = time.time()
+            
+            if scheduler:
+                self._revisit_open_pairs(graphs, graphs2, match_dict, status, scheduler)
+        finally:
+            self.graph_aligner.solver = solver
+
+        return match_dict, status
+
+    def _process_corpus_batched(self, graphs, graphs2, batch_size):
         
         status = []
         match_dict = {}
         seconds = time.time() 
-        for i, g in enumerate(graphs):
-            match, tmpstatus, _ = self.process_pair(g, graphs2[i])
-            status.append(tmpstatus)
-            util.append_dict(match_dict, match)
-            if (i + 1) % 100 == 0:
-                logger.info("graph pairs processed: {}; time for last 100 pairs: {}".format(i + 1, time.time() - seconds))
-                seconds = time.time()
+        for start in range(0, len(graphs), batch_size):
+            for match, tmpstatus, _ in self.process_pairs(graphs[start:start + batch_size], 
+                                                            graphs2[start:start + batch_size]):
+                status.append(tmpstatus)
+                util.append_dict(match_dict, match)
+            logger.info("graph pairs processed: {}; time for last batch: {}".format(len(status), time.time() - seconds))
+            seconds = time.time()
+        
         return match_dict, status
 
+    def _revisit_open_pairs(self, graphs, graphs2, match_dict, status, scheduler):
+        
+        open_pairs = [i for i, stat in enumerate(status) if stat[1] - stat[0] > 1e-6]
+        if not open_pairs or scheduler.remaining <= 0:
+            return None
+        
+        logger.info("revisiting {} graph pairs without proven optimal alignment, \
+                    time left: {} secs".format(len(open_pairs), scheduler.remaining))
+        
+        for n, i in enumerate(open_pairs):
+            if scheduler.remaining <= 0:
+                break
+            scheduler.problems_left = len(open_pairs) - n
+            match, tmpstatus, _ = self.process_pair(graphs[i], graphs2[i])
+            
+            # keep better alignment, both bounds are valid, so we keep the tightest
+            if tmpstatus[0] > status[i][0]:
+                for key in match:
+                    match_dict[key][i] = match[key]
+            status[i] = (max(tmpstatus[0], status[i][0]), min(tmpstatus[1], status[i][1]))
+        
+        return None
     
-    def score_corpus(self, graphs, graphs2):
+    def score_corpus(self, graphs, graphs2, time_budget=None, batch_size=None):
         
-        match_dict, status = self.process_corpus(graphs, graphs2)
+        match_dict, status = self.process_corpus(graphs, graphs2, time_budget=time_budget, batch_size=batch_size)
         
         final_result = None
         
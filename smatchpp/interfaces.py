@@ -65,9 +65,28 @@ class GraphPairPreparer:
 
 class TripleMatcher:
     
+    # True if triples can only match if they are identical, 
+    # then match dicts can be built by looking up identical triples
+    exact = False
+
     def triplematch(self, triple1, triple2):
         return self._triplematch(triple1, triple2)
 
+    def triplematch_batch(self, triples1, triples2):
+        # returns a matrix with the match scores of all pairs of triples
+        scores = self._triplematch_batch(triples1, triples2)
+        if scores.shape != (len(triples1), len(triples2)):
+            raise ValueError("invalid output, must return matrix of shape ({}, {})".format(len(triples1), len(triples2)))
+        return scores
+
+    def _triplematch_batch(self, triples1, triples2):
+        # by default, we match all pairs one by one
+        scores = np.zeros((len(triples1), len(triples2)))
+        for i, triple1 in enumerate(triples1):
+            for j, triple2 in enumerate(triples2):
+                scores[i, j] = self._triplematch(triple1, triple2)
+        return scores
+
 
 class SubgraphExtractor:
 
@@ -110,6 +129,19 @@ class Solver:
         self._check_result(alignment, upperbound, lowerbound, V)
         return alignment, lowerbound, upperbound
 
+    def solve_batch(self, problems):
+        # problems is a list of (unarymatch_dict, binarymatch_dict, V) tuples
+        for unarymatch_dict, binarymatch_dict, V in problems:
+            self._check_args(unarymatch_dict, binarymatch_dict, V)
+        results = self._solve_batch(problems)
+        for (alignment, lowerbound, upperbound), (_, _, V) in zip(results, problems):
+            self._check_result(alignment, upperbound, lowerbound, V)
+        return results
+
+    def _solve_batch(self, problems):
+        # by default, problems are solved one after the other
+        return [self._solve(unarymatch_dict, binarymatch_dict, V) for unarymatch_dict, binarymatch_dict, V in problems]
+
     @staticmethod
     def _check_args(unarymatch_dict, binarymatch_dict, V):
         if not isinstance(unarymatch_dict, Counter):
@@ -0,0 +1,297 @@
+import logging
+from collections import Counter
+import numpy as np
+from smatchpp import preprocess
+
+logger = logging.getLogger("__main__")
+
+
+class SymbolTable():
+    """Class that maps labels (variables, relations, concepts, constants) to ints
+
+        One table is shared by all graphs of a corpus, so every label is stored
+        and hashed only once.
+
+        Attributes:
+            symbol_index (dict): label -> int
+            symbols (list): int -> label
+    """
+
+    def __init__(self):
+        self.symbol_index = {}
+        self.symbols = []
+        return None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def intern(self, symbol):
+        """Get the int of a label, a new int if the label is new"""
+
+        index = self.symbol_index.get(symbol)
+        if index is None:
+            index = len(self.symbols)
+            self.symbol_index[symbol] = index
+            self.symbols.append(symbol)
+        return index
+
+    def intern_triples(self, triples):
+        """Convert triples with labels to an (n, 3) int64 array"""
+
+        array = np.fromiter((self.intern(symbol) for triple in triples for symbol in triple),
+                            dtype=np.int64, count=3 * len(triples))
+        return array.reshape(-1, 3)
+
+    def lookup_triples(self, array):
+        """Convert an (n, 3) int array back to triples with labels"""
+        return [tuple(self.symbols[symbol] for symbol in row) for row in array.tolist()]
+
+
+class InternedGraph():
+    """Class for a graph whose triples are stored as an (n, 3) int64 array
+
+        Variables are not identified by their name but by a flag, so variables
+        of two graphs can have the same ints without being confused.
+
+        Attributes:
+            triples (2d array): (n, 3) int64 array with (source, relation, target)
+            is_var (2d array): (n, 3) boolean array, True if the symbol is a variable
+    """
+
+    def __init__(self, triples, is_var=None):
+        self.triples = triples
+        self.is_var = is_var
+        if self.is_var is None:
+            self.is_var = np.zeros(triples.shape, dtype=bool)
+        return None
+
+    def __len__(self):
+        return self.triples.shape[0]
+
+    @property
+    def variables(self):
+        """Sorted ints of all variables, the position is the index of a variable"""
+        return np.unique(self.triples[self.is_var])
+
+    def mark_variables(self, instance):
+        """Flag variables, i.e., all sources of instance triples, wherever they
+           occur (except as the concept of an instance triple)
+
+            Args:
+                instance (int): the int of ":instance"
+        """
+
+        is_instance = self.triples[:, 1] == instance
+        variables = np.unique(self.triples[is_instance, 0])
+        self.is_var = np.zeros(self.triples.shape, dtype=bool)
+        self.is_var[:, 0] = np.isin(self.triples[:, 0], variables)
+        self.is_var[:, 2] = np.isin(self.triples[:, 2], variables) & ~is_instance
+        return None
+
+
+def intern_graph(triples, symbol_table):
+    """Convert a graph (list of triples) to an InternedGraph with flagged variables
+
+        Args:
+            triples (list): the graph
+            symbol_table (SymbolTable): the table of the corpus
+
+        Returns:
+            InternedGraph
+    """
+
+    graph = InternedGraph(symbol_table.intern_triples(triples))
+    graph.mark_variables(symbol_table.intern(":instance"))
+    return graph
+
+
+class InternedGraphPairPreparer():
+    """Class for preparing pairs of interned graphs
+
+        Same as preprocess.BasicGraphPairPreparer, but variables don't need
+        to be renamed, since they are flagged. The concepts that are compressed
+        are selected by the same code.
+
+        Attributes:
+            symbol_table (SymbolTable): the table of the corpus
+            lossless_graph_compression (bool): replace variables with their
+                                               concept if the concept is mentioned
+                                               at most once in each graph
+    """
+
+    def __init__(self, symbol_table, lossless_graph_compression=False):
+        self.symbol_table = symbol_table
+        self.lossless_graph_compression = lossless_graph_compression
+        return None
+
+    def prepare(self, graph1, graph2):
+
+        instance = self.symbol_table.intern(":instance")
+        graph1 = InternedGraph(graph1.triples.copy(), graph1.is_var)
+        graph2 = InternedGraph(graph2.triples.copy(), graph2.is_var)
+        if self.lossless_graph_compression:
+            self._lossless_reduction(graph1, graph2, instance)
+        graph1.mark_variables(instance)
+        graph2.mark_variables(instance)
+        return graph1, graph2
+
+    @staticmethod
+    def _get_var_concept_dict(graph, instance):
+        instances = graph.triples[graph.triples[:, 1] == instance]
+        return dict(zip(instances[:, 0].tolist(), instances[:, 2].tolist()))
+
+    @staticmethod
+    def _lossless_reduction_with_dict(graph, single_ref, var_concept, instance):
+
+        replace = {var: concept for var, concept in var_concept.items() if concept in single_ref}
+        if not replace:
+            return None
+        keys = np.array(sorted(replace), dtype=np.int64)
+        values = np.array([replace[key] for key in keys.tolist()], dtype=np.int64)
+
+        triples = graph.triples
+        is_instance = triples[:, 1] == instance
+        source = np.isin(triples[:, 0], keys)
+        target = np.isin(triples[:, 2], keys) & ~is_instance
+
+        # we can remove the instance triples of replaced variables
+        keep = ~(source & is_instance)
+        triples[source, 0] = values[np.searchsorted(keys, triples[source, 0])]
+        triples[target, 2] = values[np.searchsorted(keys, triples[target, 2])]
+        graph.triples = triples[keep]
+        graph.is_var = graph.is_var[keep]
+        return None
+
+    def _lossless_reduction(self, graph1, graph2, instance):
+
+        var_concept1 = self._get_var_concept_dict(graph1, instance)
+        var_concept2 = self._get_var_concept_dict(graph2, instance)
+        single_ref = preprocess.BasicGraphPairPreparer.get_single_ref_concepts(
+                var_concept1, var_concept2, len(graph1), len(graph2))
+
+        self._lossless_reduction_with_dict(graph1, single_ref, var_concept1, instance)
+        self._lossless_reduction_with_dict(graph2, single_ref, var_concept2, instance)
+        return None
+
+
+def _join(keys1, keys2):
+    """Find all pairs of rows with equal keys
+
+        Args:
+            keys1 (2d array): one key per row
+            keys2 (2d array): one key per row
+
+        Returns:
+            two index arrays, (keys1[idx1[n]] == keys2[idx2[n]]) for all n
+    """
+
+    if not keys1.shape[0] or not keys2.shape[0]:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    _, inverse = np.unique(np.concatenate([keys1, keys2]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    codes1, codes2 = inverse[:keys1.shape[0]], inverse[keys1.shape[0]:]
+
+    order = np.argsort(codes2, kind="stable")
+    codes2_sorted = codes2[order]
+    lo = np.searchsorted(codes2_sorted, codes1, side="left")
+    counts = np.searchsorted(codes2_sorted, codes1, side="right") - lo
+    idx1 = np.repeat(np.arange(codes1.shape[0]), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    idx2 = order[np.repeat(lo, counts) + offsets]
+    return idx1, idx2
+
+
+def get_match_dicts(graph1, graph2):
+    """Compute unary and binary match dicts of two interned graphs, for
+       matching of identical triples (as with score.IDTripleMatcher)
+
+        Args:
+            graph1 (InternedGraph): prepared graph
+            graph2 (InternedGraph): prepared graph
+
+        Returns:
+            unarymatch_dict (Counter), binarymatch_dict (Counter), V (int),
+            same as GraphAligner, variable indices are positions in graph.variables
+    """
+
+    vars1, vars2 = graph1.variables, graph2.variables
+    V = max(vars1.shape[0], vars2.shape[0])
+    triples1, triples2 = graph1.triples, graph2.triples
+
+    # unary: triples with a variable as source match on (relation, target),
+    # triples with a variable as target on (source, relation), one entry per occurrence
+    unarymatch_dict = Counter()
+    for var_column, key_columns in [(0, [1, 2]), (2, [0, 1])]:
+        other_column = 2 - var_column
+        sel1 = graph1.is_var[:, var_column] & ~graph1.is_var[:, other_column]
+        sel2 = graph2.is_var[:, var_column] & ~graph2.is_var[:, other_column]
+        idx1, idx2 = _join(triples1[sel1][:, key_columns], triples2[sel2][:, key_columns])
+        i = np.searchsorted(vars1, triples1[sel1][idx1, var_column])
+        j = np.searchsorted(vars2, triples2[sel2][idx2, var_column])
+        codes, counts = np.unique(i * V + j, return_counts=True)
+        i, j = np.divmod(codes, V)
+        unarymatch_dict.update(dict(zip(zip(i.tolist(), j.tolist()), counts.tolist())))
+
+    # binary: unique triples with variables on both ends match on their relation,
+    # weighted with the lower count of the two triples
+    binarymatch_dict = Counter()
+    both1 = triples1[graph1.is_var[:, 0] & graph1.is_var[:, 2]]
+    both2 = triples2[graph2.is_var[:, 0] & graph2.is_var[:, 2]]
+    if both1.shape[0] and both2.shape[0]:
+        both1, counts1 = np.unique(both1, axis=0, return_counts=True)
+        both2, counts2 = np.unique(both2, axis=0, return_counts=True)
+        idx1, idx2 = _join(both1[:, [1]], both2[:, [1]])
+        i, k = np.searchsorted(vars1, both1[idx1, 0]), np.searchsorted(vars1, both1[idx1, 2])
+        j, l = np.searchsorted(vars2, both2[idx2, 0]), np.searchsorted(vars2, both2[idx2, 2])
+        half = np.minimum(counts1[idx1], counts2[idx2]) / 2
+        codes = np.concatenate([((i * V + j) * V + k) * V + l, ((k * V + l) * V + i) * V + j])
+        codes, inverse = np.unique(codes, return_inverse=True)
+        scores = np.bincount(inverse.reshape(-1), weights=np.concatenate([half, half]))
+        ij, kl = np.divmod(codes, V * V)
+        keys = zip(*(x.tolist() for x in np.divmod(ij, V) + np.divmod(kl, V)))
+        binarymatch_dict = Counter(dict(zip(keys, scores.tolist())))
+
+    return unarymatch_dict, binarymatch_dict, V
+
+
+def score_alignment(graph1, graph2, alignmat):
+    """Count matching triples of two interned graphs given an alignment,
+       for matching of identical triples (as with score.IDTripleMatcher)
+
+        Args:
+            graph1 (InternedGraph): prepared graph
+            graph2 (InternedGraph): prepared graph
+            alignmat (array): alignment from variables of graph1 to variables
+                              of graph2, -1 if unaligned
+
+        Returns:
+            array with [matchsum graph1, matchsum graph2, len graph1, len graph2],
+            same as score.TripleScorer
+    """
+
+    vars1, vars2 = graph1.variables, graph2.variables
+    n1, n2 = vars1.shape[0], vars2.shape[0]
+
+    # variables get negative codes: -(j + 1) for variable j of graph2, and
+    # the same code for variables of graph1 that are aligned to it
+    partners = -(n2 + 1 + np.arange(n1))
+    alignmat = np.asarray(alignmat, dtype=np.int64)[:n1]
+    aligned = (alignmat >= 0) & (alignmat < n2)
+    partners[:alignmat.shape[0]][aligned] = -(alignmat[aligned] + 1)
+
+    codes1 = graph1.triples.copy()
+    codes1[graph1.is_var] = partners[np.searchsorted(vars1, graph1.triples[graph1.is_var])]
+    codes2 = graph2.triples.copy()
+    codes2[graph2.is_var] = -(np.searchsorted(vars2, graph2.triples[graph2.is_var]) + 1)
+
+    # every triple matches min(count in graph1, count in graph2) times
+    matchsum = 0.0
+    if codes1.shape[0] and codes2.shape[0]:
+        _, inverse = np.unique(np.concatenate([codes1, codes2]), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts1 = np.bincount(inverse[:codes1.shape[0]], minlength=inverse.max() + 1)
+        counts2 = np.bincount(inverse[codes1.shape[0]:], minlength=inverse.max() + 1)
+        matchsum = float(np.minimum(counts1, counts2).sum())
+
+    return np.array([matchsum, matchsum, len(graph1), len(graph2)])
@@ -121,11 +121,19 @@ class BasicGraphPairPreparer(interfaces.GraphPairPreparer):
 
         return None
 
-    def _lossless_reduction(self, triples1, triples2):
-        
-        # get var concept dict for both graphs
-        var_concept1 = util.get_var_concept_dict(triples1)
-        var_concept2 = util.get_var_concept_dict(triples2)
+    @staticmethod
+    def get_single_ref_concepts(var_concept1, var_concept2, n_triples1, n_triples2):
+        """Get the concepts whose variables can be replaced by the concept
+
+            Args:
+                var_concept1 (dict): variable -> concept of graph 1
+                var_concept2 (dict): variable -> concept of graph 2
+                n_triples1 (int): number of triples of graph 1
+                n_triples2 (int): number of triples of graph 2
+
+            Returns:
+                set with concepts that are mentioned at most once in each graph
+        """
 
         # count concept mentions
         concept_count1 = defaultdict(int)
@@ -144,11 +152,11 @@ class BasicGraphPairPreparer(interfaces.GraphPairPreparer):
             co2 = concept_count2[c]
             
             # prevent empty graph 1
-            if co1 == len(triples1):
+            if co1 == n_triples1:
                 continue
             
             # prevent empty graph 2
-            if co2 == len(triples2):
+            if co2 == n_triples2:
                 continue
 
             # either graph has only one mention of a concept, so we will 
@@ -161,6 +169,17 @@ class BasicGraphPairPreparer(interfaces.GraphPairPreparer):
             elif co1 == co2 == 1:
                 single_ref.add(c)
         
+        return single_ref
+
+    def _lossless_reduction(self, triples1, triples2):
+        
+        # get var concept dict for both graphs
+        var_concept1 = util.get_var_concept_dict(triples1)
+        var_concept2 = util.get_var_concept_dict(triples2)
+
+        # gather concepts that are maximally mentioned once in each graph
+        single_ref = self.get_single_ref_concepts(var_concept1, var_concept2, len(triples1), len(triples2))
+        
         # perform graph reduction based on gathered info
         self._lossless_reduction_with_dict(triples1, single_ref, var_concept1)
         self._lossless_reduction_with_dict(triples2, single_ref, var_concept2)
@@ -6,17 +6,39 @@ from collections import Counter
 logger = logging.getLogger("__main__")
                  
 
+def _identical_triples(triples1, triples2):
+    """Matrix that is True where triples are identical (as strings)"""
+    
+    codes = {}
+    codes1 = np.array([codes.setdefault(str(t), len(codes)) for t in triples1], dtype=int)
+    codes2 = np.array([codes.setdefault(str(t), len(codes)) for t in triples2], dtype=int)
+    return codes1[:, None] == codes2[None, :]
+
+
+def _instance_triples(triples):
+    """Array that is True for instance triples"""
+    return np.array([t[1] == ":instance" for t in triples], dtype=bool)
+
+
 class IDTripleMatcher(interfaces.TripleMatcher):
     
+    exact = True
+
     @staticmethod
     def _triplematch(t1, t2): 
         string1 = str(t1)
         string2 = str(t2)
         return int(string1 == string2)
 
+    @staticmethod
+    def _triplematch_batch(triples1, triples2):
+        return _identical_triples(triples1, triples2).astype(float)
+
 
 class ConceptFocusMatcher(interfaces.TripleMatcher): 
     # experimental matcher example for focusing on node labels
+    
+    exact = True
 
     @staticmethod
     def _triplematch(t1, t2): 
@@ -27,6 +49,12 @@ class ConceptFocusMatcher(interfaces.TripleMatcher):
             sc *= 3.0
         return sc
 
+    @staticmethod
+    def _triplematch_batch(triples1, triples2):
+        scores = _identical_triples(triples1, triples2).astype(float)
+        scores[np.outer(_instance_triples(triples1), _instance_triples(triples2))] *= 3.0
+        return scores
+
 
 class EmbeddingConceptMatcher(interfaces.TripleMatcher): 
     # experimental matcher example for allowing graded matches 
@@ -64,6 +92,42 @@ class EmbeddingConceptMatcher(interfaces.TripleMatcher):
             return 1 - self.scipy.spatial.distance.cosine(vc1, vc2)
         return sc
 
+    def _normalized_concept_vectors(self, triples):
+        """Unit vectors of the concepts of instance triples (zero for other triples)"""
+        
+        vectors = None
+        for n, t in enumerate(triples):
+            if t[1] != ":instance":
+                continue
+            vector = self.vectors.get(t[2])
+            if vector is None:
+                continue
+            if vectors is None:
+                vectors = np.zeros((len(triples), len(vector)))
+            vectors[n] = vector
+        if vectors is None:
+            return np.zeros((len(triples), 1))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _triplematch_batch(self, triples1, triples2):
+        
+        identical = _identical_triples(triples1, triples2)
+        scores = identical.astype(float)
+        
+        # graded matches of concepts of the same source, all cosines with one matrix product
+        sources = {}
+        sources1 = np.array([sources.setdefault(t[0], len(sources)) for t in triples1], dtype=int)
+        sources2 = np.array([sources.setdefault(t[0], len(sources)) for t in triples2], dtype=int)
+        graded = (~identical & (sources1[:, None] == sources2[None, :]) 
+                    & np.outer(_instance_triples(triples1), _instance_triples(triples2)))
+        if graded.any():
+            vectors1 = self._normalized_concept_vectors(triples1)
+            vectors2 = self._normalized_concept_vectors(triples2)
+            if vectors1.shape[1] == vectors2.shape[1]:
+                scores[graded] = (vectors1 @ vectors2.T)[graded]
+        return scores
+
 
 class TripleScorer(interfaces.Scorer):
 
@@ -160,22 +224,32 @@ class TripleScorer(interfaces.Scorer):
         """
         
         matchsum = 0.0
-        for triple in triplecountdict1:
-            # greedy matching to account if we want 
-            # to allow graded triple matching (which we normally don't)
-            # that's a source of asymmetry
-            scores = [0.0] 
-            for triple_other in triplecountdict2:
-                match = self.triplematcher.triplematch(triple, triple_other)
-                
-                # count == 1 if there are no duplicate triples
-                count = min(triplecountdict1[triple], triplecountdict2[triple_other])
-                
-                # this is how many we can possibly match
-                match *= count
-                scores.append(match)
-            
-            matchsum += max(scores)
+        
+        # only identical triples can match, so we look them up
+        if self.triplematcher.exact:
+            for triple in triplecountdict1:
+                if triple in triplecountdict2:
+                    match = self.triplematcher.triplematch(triple, triple)
+                    matchsum += max(0.0, match * min(triplecountdict1[triple], triplecountdict2[triple]))
+            return matchsum
+        
+        triples1 = list(triplecountdict1)
+        triples2 = list(triplecountdict2)
+        if not triples1 or not triples2:
+            return matchsum
+        
+        # greedy matching to account if we want 
+        # to allow graded triple matching (which we normally don't)
+        # that's a source of asymmetry
+        scores = self.triplematcher.triplematch_batch(triples1, triples2)
+        
+        # count == 1 if there are no duplicate triples, 
+        # this is how many we can possibly match
+        counts1 = np.array([triplecountdict1[triple] for triple in triples1])
+        counts2 = np.array([triplecountdict2[triple] for triple in triples2])
+        scores = scores * np.minimum(counts1[:, None], counts2[None, :])
+        
+        matchsum += float(np.maximum(scores.max(axis=1), 0.0).sum())
         return matchsum
 
     def _score_given_alignment(self, triples1, triples2, alignmat, varindex):
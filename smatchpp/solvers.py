@@ -1,17 +1,35 @@
 import time
+import math
 import logging
 logger = logging.getLogger("__main__")
-from random import shuffle
 import numpy as np
 import sys
-from collections import Counter
+import hashlib
+import functools
+from collections import Counter, OrderedDict, namedtuple
 from smatchpp import interfaces
 from smatchpp import util
 
-def get_solver(identifier_string):
+def get_solver(identifier_string, seed=None, n_jobs=1, patience=None):
+    """Get a solver by its name
+
+        Args:
+            identifier_string (string): name of the solver
+            seed (int): seed of the randomized solvers (hillclimber, 
+                        hillclimber_vectorized, tabu), None: not reproducible
+            n_jobs (int): processes that run hill-climbing restarts in parallel
+            patience (int): stop hill-climbing after this many restarts without 
+                            improvement, None: run all restarts
+
+        Returns:
+            solver (Solver)
+    """
 
     if identifier_string == "hillclimber":
-        return HillClimber()
+        return HillClimber(seed=seed, n_jobs=n_jobs, patience=patience)
+
+    if identifier_string == "hillclimber_vectorized":
+        return VectorizedHillClimber(seed=seed, n_jobs=n_jobs, patience=patience)
 
     if identifier_string == "ilp":
         return ILP()
@@ -22,6 +40,48 @@ def get_solver(identifier_string):
     if identifier_string == "ilp_backed":
         return BackedupILP()
 
+    if identifier_string == "ilp_certified":
+        return CertifiedILP()
+
+    if identifier_string == "ilp_sparse":
+        return ILP(model_factory=MIPModelFactory(sparse=True))
+
+    if identifier_string == "ilp_aggregated":
+        return ILP(model_factory=MIPModelFactory(linking="aggregated_columns"))
+
+    if identifier_string == "ilp_integral":
+        return ILP(model_factory=MIPModelFactory(integral_objective=True))
+
+    if identifier_string == "ilp_highs":
+        return HiGHSILP()
+
+    if identifier_string == "ilp_pruned":
+        return PruningSolver()
+
+    if identifier_string == "ilp_symmetry":
+        return ILP(model_factory=MIPModelFactory(merge_symmetric=True))
+
+    if identifier_string == "ilp_decomposed":
+        return DecomposedSolver()
+
+    if identifier_string == "assignment":
+        return AssignmentSolver()
+
+    if identifier_string == "auto":
+        return AutoSolver()
+
+    if identifier_string == "enumeration":
+        return EnumerationSolver()
+
+    if identifier_string == "tree_dp":
+        return TreeDPSolver()
+
+    if identifier_string == "tabu":
+        return TabuSearchSolver(seed=seed)
+
+    if identifier_string == "portfolio":
+        return PortfolioSolver()
+
     if identifier_string == "dummy":
         return DummySolver()
     
@@ -40,11 +100,15 @@ class DummySolver(interfaces.Solver):
     @staticmethod
     def _solve(unarymatch_dict, binarymatch_dict, V):
 
-        mat = np.zeros(V)
+        mat = np.zeros(V, dtype=int)
         for i in range(mat.shape[0]):
             mat[i] = i
+        
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        score = util.score_arrays(mat, unary, binary)
 
-        return mat, 10000000, 0.0
+        return mat, score, assignment_upper_bound_arrays(unary, binary, V)
 
 
 class HillClimber(interfaces.Solver):
@@ -53,11 +117,117 @@ class HillClimber(interfaces.Solver):
         Attributes:
             rand_inits (int): how many random restarts? More restarts
                               make better optima more likely
+            incremental (bool): keep a table with gains of all switches and after 
+                                each switch only update the entries that are affected
+                                by it (one switch per iteration)
+            seed (int): seed from which the seeds of all restarts are derived,
+                        None: not reproducible
+            n_jobs (int): number of processes that run restarts in parallel, 
+                          the processes are kept for all problems until close()
+            patience (int): stop early if this many restarts in a row didn't 
+                            improve the best score, None: run all restarts
     """
 
-    def __init__(self, rand_inits=4):
+    def __init__(self, rand_inits=4, incremental=False, seed=None, n_jobs=1, patience=None):
         self.rand_inits = rand_inits
+        self.incremental = incremental
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.patience = patience
+        self._executor = None
+        return None
+
+    def __getstate__(self):
+        # restarts are sent to worker processes with the solver, but without its pool
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def _get_executor(self):
+        """Get the pool of worker processes, it is created on first use"""
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        return self._executor
+
+    def close(self):
+        """Shut down the worker processes (if any)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
         return None
+
+    def _run_restarts(self, restart):
+        """Run random restarts, optionally in parallel processes
+
+            Every restart gets its own seed, derived from self.seed. Results are 
+            evaluated in restart order, so the outcome doesn't depend on n_jobs.
+
+            Args:
+                restart (callable): maps a seed sequence to (alignmat, score)
+
+            Returns:
+                alignmat (array): best alignment found
+                score (float): its score
+        """
+        
+        seeds = np.random.SeedSequence(self.seed).spawn(self.rand_inits)
+        
+        futures = []
+        if self.n_jobs > 1:
+            executor = self._get_executor()
+            futures = [executor.submit(restart, s) for s in seeds]
+            results = (future.result() for future in futures)
+        else:
+            results = (restart(s) for s in seeds)
+        
+        alignmat_best = None
+        max_score = None
+        no_improvement = 0
+        try:
+            for init, (alignmat, score) in enumerate(results):
+                # if solution from this init better than last inits, save
+                if max_score is None or score > max_score + 1e-9:
+                    logger.debug("new high score over candidates and inits: {}...".format(score))
+                    max_score = score
+                    alignmat_best = alignmat
+                    no_improvement = 0
+                else:
+                    no_improvement += 1
+                if self.patience is not None and no_improvement >= self.patience:
+                    logger.debug("stopping after {} restarts, no improvement".format(init + 1))
+                    break
+        finally:
+            # restarts that didn't start yet are not needed anymore, running 
+            # ones finish in the background
+            for future in futures:
+                future.cancel()
+        
+        return alignmat_best, max_score
+
+    def _restart(self, unarymatch_dict, binarymatch_dict, V, seed):
+        """Climb from a random alignment
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict->dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+                seed (SeedSequence): seed of this restart
+
+            Returns:
+                alignmat (array), score (float)
+        """
+        
+        #init random alignmat
+        alignmat = np.random.default_rng(seed).permutation(V)
+        
+        logger.debug("initialized alignment matrix:\n{}... starting climbing".format(alignmat))
+
+        if self.incremental:
+            alignmat, score, _ = self._climb_incremental(unarymatch_dict, binarymatch_dict, V, alignmat)
+        else:
+            alignmat, score, _ = self._climb(unarymatch_dict, binarymatch_dict, V, alignmat)
+        return alignmat, score
     
     @staticmethod
     def _score(alignmat, unarymatch_dict, binarymatch_dict):
@@ -102,9 +272,8 @@ class HillClimber(interfaces.Solver):
                 gain of switch (may be negative)
         """
         
-        # construct new candidate
-        amaxs_new = amaxs.copy()
-        amaxs_new[[i, k]] = amaxs[[k, i]]
+        # the new candidate differs only in i and k, so we don't construct it
+        switched = {i: l, k: j}
 
         # subtract unary malus from old alignment 
         malus = -unarymatch_dict[(i, j)]
@@ -115,27 +284,29 @@ class HillClimber(interfaces.Solver):
         bonus += unarymatch_dict[(k, j)]
         
         
-        # add binary match bonus from new alignment
+        # add binary match bonus from new alignment, every match between two different 
+        # nodes is counted twice (the dict is symmetric), except that matches between 
+        # i and k are already counted from i. Self-loops are counted once
         if (i, l) in binarymatch_dict:
             for key in binarymatch_dict[(i, l)]:
-                if amaxs_new[key[0]] == key[1]:
-                    bonus += binarymatch_dict[(i, l)][key] * 2
+                if switched.get(key[0], amaxs[key[0]]) == key[1]:
+                    bonus += binarymatch_dict[(i, l)][key] * (1 if key[0] == i else 2)
 
         if (k, j) in binarymatch_dict:
             for key in binarymatch_dict[(k, j)]:
-                if amaxs_new[key[0]] == key[1]:
-                    bonus += binarymatch_dict[(k, j)][key] * 2
+                if key[0] != i and switched.get(key[0], amaxs[key[0]]) == key[1]:
+                    bonus += binarymatch_dict[(k, j)][key] * (1 if key[0] == k else 2)
 
         # subtract binary match malus from old alignment
         if (i, j) in binarymatch_dict:
             for key in binarymatch_dict[(i, j)]:
                 if amaxs[key[0]] == key[1]:
-                    malus -= binarymatch_dict[(i, j)][key] * 2
+                    malus -= binarymatch_dict[(i, j)][key] * (1 if key[0] == i else 2)
 
         if (k, l) in binarymatch_dict:
             for key in binarymatch_dict[(k, l)]:
-                if amaxs[key[0]] == key[1]:
-                    malus -= binarymatch_dict[(k, l)][key] * 2
+                if key[0] != i and amaxs[key[0]] == key[1]:
+                    malus -= binarymatch_dict[(k, l)][key] * (1 if key[0] == k else 2)
                
         
         # cumulative gain 
@@ -261,6 +432,9 @@ class HillClimber(interfaces.Solver):
         max_score = 0.0
         alignmat_best = None
         
+        # upper bound
+        upper_bound = assignment_upper_bound(unarymatch_dict, binarymatch_dict, V)
+        
         # little pre-processing
         wd = Counter()
         tx = time.time()
@@ -273,41 +447,14 @@ class HillClimber(interfaces.Solver):
         
         
         # iterate over random inits
-        for init in range(self.rand_inits):
-            
-            #init random alignmat
-            alignmat = np.zeros(V, dtype=int)
-            aligned = set()
-            for i in range(alignmat.shape[0]):
-                idxs = [x for x in list(range(V)) if x not in aligned]
-                if not idxs:
-                    continue
-                shuffle(idxs)
-                j = idxs[0]
-                alignmat[i] = j
-                aligned.add(j)
-
-            # init best alignmat found
-            if init == 0:
-                alignmat_best = alignmat
-                max_score = self._score(alignmat, unarymatch_dict, binarymatch_dict)
-            
-            logger.debug("initialized alignment matrix:\n{}".format(alignmat))
-            logger.debug("initial score: {}... starting climbing".format(max_score))
- 
-            alignmat, score, _ = self._climb(unarymatch_dict, binarymatch_dict, V, alignmat)
-            
-            # if solution from this init better than last inits, save
-            if score > max_score:
-                logger.debug("new high score over candidates and inits: {}...".format(score))
-                max_score = score
-                alignmat_best = alignmat
+        restart = functools.partial(self._restart, unarymatch_dict, binarymatch_dict, V)
+        alignmat_best, _ = self._run_restarts(restart)
         
         # lower bound
         max_score = self._score(alignmat_best, unarymatch_dict, binarymatch_dict)
         
         # return solution, lowe bound, upp bound
-        return alignmat_best, max_score, 10000000
+        return alignmat_best, max_score, upper_bound
 
     def _climb(self, unarymatch_dict, binarymatch_dict, V, alignmat):
         """This tries out candidates and selects the one with best possible gain
@@ -352,145 +499,2259 @@ class HillClimber(interfaces.Solver):
 
         # lower bound
         score = self._score(alignmat, unarymatch_dict, binarymatch_dict)
-        
+
         return alignmat, score, 10000000
 
+    def _update_gains(self, gains, alignmat, inverse, unarymatch_dict, binarymatch_dict, candidates, nodes, partial={}):
+        """Recomputes the gains of all switches that involve the given nodes
 
-class MIPModelFactory():
-    
-    def __init__(self):
-        try:
-            import mip
-            self.mip = mip
-        except ModuleNotFoundError:
-            raise ModuleNotFoundError("Module mip not found, please install mip \
-                                       we used version 1.13.0")
+            Args:
+                gains (2d array): gain table, entry (i, k) with k < i holds gain of switch (i, k)
+                alignmat (list): alignment from V to V'
+                inverse (list): alignment from V' to V
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict->dict): scores of binary alignments
+                candidates (tuple): two dicts, node -> targets that it has matches with, and 
+                                    target -> nodes that have matches with it
+                nodes (iterable): nodes whose switches need to be re-computed
+                partial (dict): node x -> targets, only the switches of x with the
+                                nodes that are aligned to these targets are re-computed
 
-    def build_model(self, unarymatch_dict, binarymatch_dict, V):
-        
-        # init model
-        model = self.mip.Model()
-        model.verbose = 0
-        model.preprocess = -1
-        
-        # shortcut
-        ux = unarymatch_dict
+            Returns:
+                None, gain table is updated in-place
+        """
         
-        # prune space by making symmetric match dict to asymetric
-        bx = Counter()
-        for (i, j, k, l) in binarymatch_dict:
-            if (k, l, i, j) in bx:
-                continue
-            bx[(i, j, k, l)] += binarymatch_dict[(i, j, k, l)] + binarymatch_dict[(k, l, i, j)]
+        node_targets, target_nodes = candidates
+        switches = set()
+        for x in nodes:
+            # a switch (x, y) can only gain something, if x can match the target of y
+            # or y can match the target of x, all other switches have gain <= 0
+            ys = set(inverse[j] for j in node_targets.get(x, ()))
+            ys.update(target_nodes.get(alignmat[x], ()))
+            ys.discard(x)
+            switches.update((max(x, y), min(x, y)) for y in ys)
+        for x, targets in partial.items():
+            ys = set(inverse[j] for j in targets)
+            ys.discard(x)
+            switches.update((max(x, y), min(x, y)) for y in ys)
+        
+        # every switch is computed once, even if both nodes are affected
+        for i, k in switches:
+            j, l = alignmat[i], alignmat[k]
+            gains[i, k] = self._gain_of_switch(alignmat, unarymatch_dict, binarymatch_dict, i, j, k, l)
+        return None
 
-        Vr = range(V)
-        
-        # init binary alignment vars
-        x = [[model.add_var(var_type=self.mip.BINARY) for i in Vr] for j in Vr]
-        
-        # init binary match vars for binary structural matches
-        y = {}
-        
-        for (i, j, k, l) in bx:
-            y[(i, j, k, l)] = model.add_var(var_type=self.mip.BINARY)
+    def _climb_incremental(self, unarymatch_dict, binarymatch_dict, V, alignmat):
+        """Hill-climbing with a table of switch gains that is updated incrementally
+
+            The gain of switch (i, k) only depends on the alignments of i and k, and on the
+            alignments of nodes that share a binary match with i or k. So after a switch 
+            we only need to re-compute the gains of switches that involve the switched nodes
+            or their neighbors. For a neighbor x, these are all switches of x if its current 
+            pair has binary matches with the switched nodes, else only the switches that 
+            give x a target with such binary matches.
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict->dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+                alignmat (2d array): alignment from V to V'
+
+            Returns:
+                alignmat (2d array): best alignmat found
+        """
         
-        # set model objective
-        model.objective = self.mip.maximize(
-                self.mip.xsum(ux[(i, j)] * x[i][j] for i in Vr for j in Vr) 
-                + self.mip.xsum(bx[(i, j, k, l)] * y[(i, j, k, l)] for (i, j, k, l) in bx))
+        # targets that a node can match, and neighbors of a node, i.e., 
+        # the nodes that it shares binary matches with
+        # and the targets of a node that have binary matches with a neighbor
+        node_targets = {}
+        target_nodes = {}
+        neighbors = {}
+        neighbor_targets = {}
+        for (a, b) in list(unarymatch_dict) + list(binarymatch_dict):
+            node_targets.setdefault(a, set()).add(b)
+            target_nodes.setdefault(b, set()).add(a)
+        for (a, b) in binarymatch_dict:
+            for (c, d) in binarymatch_dict[(a, b)]:
+                neighbors.setdefault(a, set()).add(c)
+                neighbors.setdefault(c, set()).add(a)
+                neighbor_targets.setdefault((a, c), set()).add(b)
+        candidates = (node_targets, target_nodes)
+
+        # initial gain table, and the inverse alignment that we keep up to date
+        # (as lists, since we look up single entries)
+        gains = np.zeros((V, V))
+        alignment = alignmat.tolist()
+        inverse = np.argsort(alignmat).tolist()
+        self._update_gains(gains, alignment, inverse, unarymatch_dict, binarymatch_dict, candidates, range(V))
         
-        # constraints: every var must be aligned only to one other var (or remain unaligned)
-        for i in Vr:
-            model += self.mip.xsum(x[i][j] for j in Vr) <= 1
+        iters = 0
+        while True:
+            
+            # search best switch
+            best = np.argmax(gains)
+            if gains.flat[best] <= 0.0:
+                # We're at a (local) optimum
+                break
+            i, k = divmod(int(best), V)
+            logger.debug("new gain for candidate: {}...".format(gains[i, k]))
+            alignment[i], alignment[k] = alignment[k], alignment[i]
+            inverse[alignment[i]], inverse[alignment[k]] = i, k
+            
+            # switches of i and k have new targets, so we reset them before updating
+            gains[[i, k], :] = 0.0
+            gains[:, [i, k]] = 0.0
+
+            # update gains of switches that are affected
+            affected = {i, k}
+            partial = {}
+            for x in neighbors.get(i, set()).union(neighbors.get(k, set())) - affected:
+                targets = neighbor_targets.get((x, i), set()).union(neighbor_targets.get((x, k), ()))
+                if alignment[x] in targets:
+                    affected.add(x)
+                else:
+                    partial[x] = targets
+            self._update_gains(gains, alignment, inverse, unarymatch_dict, binarymatch_dict, 
+                                candidates, affected, partial)
+            
+            iters += 1
+            if iters > 1000:
+                logger.warning("hillclimber stopped after 1000 iterations. \
+                                This may be due to a bug or very large graph")
+                break
 
-        for i in Vr:
-            model += self.mip.xsum(x[j][i] for j in Vr) <= 1
+        # lower bound
+        alignmat = np.array(alignment)
+        score = self._score(alignmat, unarymatch_dict, binarymatch_dict)
+        
+        return alignmat, score, 10000000
 
-        # binary structural match constraint, i.e., if two vars are not aligned, all involved
-        # struct matches must be zero
-        for (i, j, k, l) in bx.keys():
-            model += y[(i, j, k, l)] <= x[i][j]
-            model += y[(i, j, k, l)] <= x[k][l]
 
-        return model, x
+class VectorizedHillClimber(HillClimber):
+    """Class that solves alignment problems with hill-climbing on numpy arrays
 
-class ILP(interfaces.Solver):
-    """Class that solves alignment problem with ILP
+        Unary scores are kept as dense VxV array, binary scores as COO index arrays.
+        The gains of all (i, k) swaps are computed in one batched step per iteration.
 
         Attributes:
-            max_seconds (int): time limit
+            rand_inits (int): how many random restarts? More restarts
+                              make better optima more likely
+            max_iters (int): maximum number of swaps per restart
+            seed (int): seed from which the seeds of all restarts are derived,
+                        None: not reproducible
+            n_jobs (int): number of processes that run restarts in parallel, 
+                          the processes are kept for all problems until close()
+            patience (int): stop early if this many restarts in a row didn't 
+                            improve the best score, None: run all restarts
     """
 
-    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False):
-        
-        self.model_factory = MIPModelFactory()
-        self.max_seconds = max_seconds
-        self.ignore_bad_solution_warning = ignore_bad_solution_warning
+    def __init__(self, rand_inits=4, max_iters=1000, seed=None, n_jobs=1, patience=None):
+        self.rand_inits = rand_inits
+        self.max_iters = max_iters
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.patience = patience
+        self._executor = None
         return None
 
+    @staticmethod
+    def _score(alignmat, unary, binary):
+        """Score an alignment candidate
+
+            Args:
+                alignmat (array): alignments from V to V'
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+
+            Returns:
+                score (float)
+        """
+        return util.score_arrays(alignmat, unary, binary)
+
+    @staticmethod
+    def _swap_gains(alignmat, unary, binary):
+        """Compute gains of all switch candidates
+
+            Args:
+                alignmat (array): alignment from V to V', must be a permutation
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+
+            Returns:
+                VxV array, entry (i, k) is the gain of (i->j --> i->l); (k->l --> k->j)
+        """
+
+        V = alignmat.shape[0]
+        inverse = np.empty(V, dtype=int)
+        inverse[alignmat] = np.arange(V)
+
+        # unary gains: m[i, k] is unary score of i -> alignmat[k]
+        m = unary[:, alignmat]
+        d = np.diag(m)
+        gains = m + m.T - d[:, None] - d[None, :]
+
+        p, q, r, s, w = binary
+        if w.shape[0]:
+            ap = alignmat[p]
+            ar = alignmat[r]
+            okp = ap == q
+            okr = ar == s
+            loop = p == r
+
+            # binary malus: any switch that touches an active match destroys it
+            active = okp & okr
+            pa, ra, wa = p[active], r[active], w[active]
+            distinct = pa != ra
+            node_loss = np.zeros(V)
+            np.add.at(node_loss, pa, wa)
+            np.add.at(node_loss, ra[distinct], wa[distinct])
+            pair_loss = np.zeros((V, V))
+            np.add.at(pair_loss, (pa[distinct], ra[distinct]), wa[distinct])
+            gains -= node_loss[:, None] + node_loss[None, :] - pair_loss - pair_loss.T
+
+            # binary bonus, bonus[x, y] for switch (x, y) is symmetrized below
+            bonus = np.zeros((V, V))
+            kq = inverse[q]
+            ks = inverse[s]
+
+            # p moves to q, r already at s
+            sel = ~loop & ~okp & okr & (kq != r)
+            np.add.at(bonus, (p[sel], kq[sel]), w[sel])
+
+            # r moves to s, p already at q
+            sel = ~loop & ~okr & okp & (ks != p)
+            np.add.at(bonus, (r[sel], ks[sel]), w[sel])
+
+            # p and r switch their partners
+            sel = ~loop & (ar == q) & (ap == s)
+            np.add.at(bonus, (p[sel], r[sel]), w[sel])
+
+            # self-loop p == r moves to q == s
+            sel = loop & (q == s) & ~okp
+            np.add.at(bonus, (p[sel], kq[sel]), w[sel])
+
+            gains += bonus + bonus.T
+
+        np.fill_diagonal(gains, 0.0)
+        return gains
+
+    def _climb(self, unary, binary, V, alignmat):
+        """Climbs from an alignment by always applying the best switch
+
+            Args:
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
+                alignmat (array): initial alignment from V to V', must be a permutation
+
+            Returns:
+                alignmat (array): best alignmat found
+                score (float)
+        """
+
+        iters = 0
+        while True:
+            gains = self._swap_gains(alignmat, unary, binary)
+            best = np.argmax(gains)
+            if gains.flat[best] <= 1e-9:
+                # We're at a (local) optimum
+                break
+            i, k = divmod(best, V)
+            alignmat[[i, k]] = alignmat[[k, i]]
+            iters += 1
+            if iters >= self.max_iters:
+                logger.warning("vectorized hillclimber stopped after {} iterations. \
+                                This may be due to a bug or very large graph".format(self.max_iters))
+                break
+
+        score = self._score(alignmat, unary, binary)
+        return alignmat, score
+
+    def _restart(self, unary, binary, V, seed):
+        """Climb from a random alignment
+
+            Args:
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
+                seed (SeedSequence): seed of this restart
+
+            Returns:
+                alignmat (array), score (float)
+        """
+        alignmat = np.random.default_rng(seed).permutation(V)
+        return self._climb(unary, binary, V, alignmat)
+
     def _solve(self, unarymatch_dict, binarymatch_dict, V):
-         
-        # get model
-        model, x = self.model_factory.build_model(unarymatch_dict, binarymatch_dict, V)
+
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+
+        # iterate over random inits
+        restart = functools.partial(self._restart, unary, binary, V)
+        alignmat_best, max_score = self._run_restarts(restart)
+
+        # return solution, lower bound, upper bound
+        upper_bound = assignment_upper_bound_arrays(unary, binary, V)
+        return alignmat_best, max_score, upper_bound
+
+
+def get_assignment_profits(unary, binary, V):
+    """Optimistic profits of aligning single pairs
+
+        The profit of pair (i, j) is its unary score plus the best binary score that 
+        it can achieve, i.e., for every other node k, the best binary match with 
+        any (k, l). For every alignment, the score is at most the sum of profits 
+        of the aligned pairs.
+
+        Args:
+            unary (2d array): dense unary scores
+            binary (tuple): COO binary scores (i, j, k, l, score)
+            V (int): max(nodes V, nodes V')
+
+        Returns:
+            VxV array with profits
+    """
+    
+    profits = unary.copy()
+    i, j, k, _, w = binary
+    if w.shape[0]:
+        # max over l for every (i, j, k), then sum over k
+        keys = (i * V + j) * V + k
+        order = np.argsort(keys, kind="stable")
+        keys_unique, starts = np.unique(keys[order], return_index=True)
+        best = np.maximum.reduceat(w[order], starts)
+        np.add.at(profits.reshape(-1), keys_unique // V, best)
+    return profits
+
+
+def assignment_upper_bound(unarymatch_dict, binarymatch_dict, V):
+    """Cheap upper bound of an alignment problem via linear assignment
+
+        Args:
+            unarymatch_dict (dict): scores of unary alignments 
+            binarymatch_dict (dict): scores of binary alignments
+            V (int): max(nodes V, nodes V')
+
+        Returns:
+            upper bound (float)
+    """
+
+    unary = util.unarymatch_array(unarymatch_dict, V)
+    binary = util.binarymatch_arrays(binarymatch_dict)
+    return assignment_upper_bound_arrays(unary, binary, V)
+
+
+def assignment_upper_bound_arrays(unary, binary, V):
+    """Same as assignment_upper_bound, but for dense unary and COO binary scores"""
+
+    from scipy.optimize import linear_sum_assignment
+
+    profits = get_assignment_profits(unary, binary, V)
+    rows, cols = linear_sum_assignment(profits, maximize=True)
+    return float(profits[rows, cols].sum())
+
+
+class AssignmentSolver(interfaces.Solver):
+    """Class that solves alignment problems with linear assignment (Hungarian algorithm)
+
+        If there are no binary matches, the solution is optimal. Else, we return 
+        the best of two alignments (assignment of unary scores, and assignment of 
+        optimistic pair profits), and the upper bound from the optimistic profits.
+    """
+
+    def __init__(self):
         
-        # optimizing
-        status = model.optimize(relax=False, max_seconds=self.max_seconds)
+        from scipy.optimize import linear_sum_assignment
+        self._linear_sum_assignment = linear_sum_assignment
+        return None
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
         
-        # checking if a solution was found, and return result
-        if model.num_solutions:
-            logger.debug("alignment with value {} found".format(model.objective_value))
-            Vr = range(V)
-            alignmat = np.array([x[i][j].x for i in Vr for j in Vr]).reshape((V, V))
-            alignmat = util.alignmat_compressed(alignmat)
-            return alignmat, model.objective_value, model.objective_bound
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
         
-        if not self.ignore_bad_solution_warning:
-            logger.warning("not one good alignment found in reasonbable time ({} secs), \
-                        consider increasing time limit, using Backup ILP (e.g., ILP + Hillclimber), \
-                        or lossless graph_compression".format(self.max_seconds))
+        # only unary matches, this is solved exactly
+        _, alignmat = self._linear_sum_assignment(unary, maximize=True)
+        lower_bound = util.score_arrays(alignmat, unary, binary)
+        if not binarymatch_dict:
+            return alignmat, lower_bound, lower_bound
         
-        dummy_alignmat =  np.zeros((V, V))
-        dummy_alignmat = util.alignmat_compressed(dummy_alignmat)
-        return dummy_alignmat, 0.0, 10000000
+        # optimistic profits give upper bound and another candidate
+        profits = get_assignment_profits(unary, binary, V)
+        _, candidate = self._linear_sum_assignment(profits, maximize=True)
+        upper_bound = float(profits[np.arange(V), candidate].sum())
+        candidate_score = util.score_arrays(candidate, unary, binary)
+        if candidate_score > lower_bound:
+            alignmat, lower_bound = candidate, candidate_score
         
+        return alignmat, lower_bound, upper_bound
 
-class LP(interfaces.Solver):
-    """Class that solves alignment problem with LP (relaxing ILP, possibly leading to 
-       worse solution, but upperbounds are still valid)
+
+class TabuSearchSolver(interfaces.Solver):
+    """Class that solves alignment problems with tabu search
+
+        Same neighborhood as the hill-climbers: a move switches the partners of 
+        two nodes i and k. In every iteration we make the best move, even if it 
+        decreases the score, but nodes that were recently moved are tabu for some 
+        iterations (unless the move yields a new best score). This lets the search 
+        escape local optima. We start from the linear assignment solution.
 
         Attributes:
-            max_seconds (int): time limit
+            max_seconds (float): time limit
+            max_iters (int): maximum number of moves, None: only time limit
+            tenure (int): number of iterations a moved node stays tabu, 
+                          None: max(3, V // 20)
+            stall (int): if the best score didn't improve for this many iterations,
+                         restart from the best alignment with some random switches, 
+                         None: 10 * tenure
+            max_restarts (int): stop after this many restarts without a new best score,
+                                None: only time limit and max_iters
+            seed (int): seed for breaking ties and restarts, None: not reproducible
     """
 
-    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False):
-        
-        self.model_factory = MIPModelFactory()
-        self.max_seconds = max_seconds 
-        self.ignore_bad_solution_warning = ignore_bad_solution_warning
+    def __init__(self, max_seconds=5, max_iters=None, tenure=None, stall=None, max_restarts=5, seed=None):
+        self.max_seconds = max_seconds
+        self.max_iters = max_iters
+        self.tenure = tenure
+        self.stall = stall
+        self.max_restarts = max_restarts
+        self.seed = seed
         return None
 
     def _solve(self, unarymatch_dict, binarymatch_dict, V):
-         
-        # get model
-        model, x = self.model_factory.build_model(unarymatch_dict, binarymatch_dict, V)
         
-        # optimizing
-        status = model.optimize(relax=True, max_seconds=self.max_seconds)
+        tx = time.time()
+        rng = np.random.default_rng(self.seed)
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        
+        # start from linear assignment
+        alignmat, score, upper_bound = AssignmentSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        alignmat = np.asarray(alignmat, dtype=int).copy()
+        alignmat_best = alignmat.copy()
+        best_score = score
+        
+        tenure = self.tenure if self.tenure is not None else max(3, V // 20)
+        stall = self.stall if self.stall is not None else 10 * tenure
+        profits = get_assignment_profits(unary, binary, V)
+        tabu_until = np.zeros(V, dtype=int)
+        iters = 0
+        last_improvement = 0
+        restarts = 0
         
-        # checking if a solution was found, and return result
-        if model.num_solutions:
-            logger.debug("alignment with value {} found".format(model.objective_value))
-            Vr = range(V)
-            alignmat = np.array([x[i][j].x for i in Vr for j in Vr]).reshape((V, V))
-            alignmat = util.alignmat_compressed(alignmat)
+        while V > 1 and best_score < upper_bound - 1e-6:
+            if self.max_iters is not None and iters >= self.max_iters:
+                break
+            if time.time() - tx > self.max_seconds:
+                break
             
-            # the objective value model.objective_value is optimistic, probably
-            # so we obtain a more accurate one with (messy) tricks 
+            # diversify: restart from best alignment with random switches
+            if iters - last_improvement > stall:
+                if self.max_restarts is not None and restarts >= self.max_restarts:
+                    break
+                restarts += 1
+                alignmat = alignmat_best.copy()
+                for _ in range(max(2, V // 10)):
+                    i, k = rng.integers(V, size=2)
+                    alignmat[[i, k]] = alignmat[[k, i]]
+                score = util.score_arrays(alignmat, unary, binary)
+                tabu_until[:] = 0
+                last_improvement = iters
+            
+            gains = VectorizedHillClimber._swap_gains(alignmat, unary, binary)
+            
+            # moves of tabu nodes are only allowed if they give a new best score
+            free = tabu_until <= iters
+            allowed = (free[:, None] & free[None, :]) | (score + gains > best_score + 1e-9)
+            np.fill_diagonal(allowed, False)
+            gains_allowed = np.where(allowed, gains, -np.inf)
+            best_gain = gains_allowed.max()
+            if best_gain == -np.inf:
+                tabu_until[:] = 0
+                continue
+            
+            # break ties by potential (optimistic profits of the new pairs), then randomly
+            candidates = np.flatnonzero(gains_allowed.reshape(-1) >= best_gain - 1e-9)
+            ci, ck = np.divmod(candidates, V)
+            potential = (profits[ci, alignmat[ck]] + profits[ck, alignmat[ci]] 
+                            - profits[ci, alignmat[ci]] - profits[ck, alignmat[ck]])
+            candidates = candidates[potential >= potential.max() - 1e-9]
+            i, k = divmod(candidates[rng.integers(candidates.shape[0])], V)
+            alignmat[[i, k]] = alignmat[[k, i]]
+            score += gains[i, k]
+            tabu_until[[i, k]] = iters + tenure + rng.integers(3)
+            
+            if score > best_score + 1e-9:
+                best_score = score
+                alignmat_best = alignmat.copy()
+                last_improvement = iters
+                restarts = 0
+            iters += 1
+        
+        logger.debug("tabu search stopped after {} moves, best score: {}".format(iters, best_score))
+        
+        best_score = util.score_arrays(alignmat_best, unary, binary)
+        return alignmat_best, best_score, upper_bound
 
-            # first we destroy invalid alignments (e.g., two nodes of a aligning with the same (one) node of b)
-            for i, e in enumerate(alignmat):
-                if e in alignmat[:i]:
-                    alignmat[i] = alignmat[:i].max() + 1
+
+class EnumerationSolver(interfaces.Solver):
+    """Class that solves small alignment problems exactly by enumeration
+
+        Nodes of V are assigned one after the other, all partial alignments of 
+        one level are expanded at once with numpy. Every binary match is counted 
+        when its later node is assigned. Partial alignments whose optimistic 
+        completion can't beat the incumbent (from linear assignment) are pruned.
+
+        Attributes:
+            max_size (int): largest V that is enumerated
+            fallback_solver (Solver): solver used for larger problems, None: ILP
+    """
+
+    def __init__(self, max_size=8, fallback_solver=None):
+        self.max_size = max_size
+        self._fallback_solver = fallback_solver
+        return None
+
+    @property
+    def fallback_solver(self):
+        # created on first use, so that mip is only needed for large problems
+        if self._fallback_solver is None:
+            self._fallback_solver = ILP()
+        return self._fallback_solver
+
+    @fallback_solver.setter
+    def fallback_solver(self, solver):
+        self._fallback_solver = solver
+
+    @staticmethod
+    def _attribute(binary, V):
+        """Attribute binary matches to their later node
+
+            Args:
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                list with one tuple per node t: (other node, its target, 
+                target of t, score) of all binary matches that t completes
+        """
+        
+        p, q, r, s, w = binary
+        later = np.maximum(p, r)
+        p_is_later = p == later
+        other = np.where(p_is_later, r, p)
+        target_other = np.where(p_is_later, s, q)
+        target_later = np.where(p_is_later, q, s)
+        
+        attributed = []
+        for t in range(V):
+            sel = later == t
+            attributed.append((other[sel], target_other[sel], target_later[sel], w[sel]))
+        return attributed
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        if V > self.max_size:
+            return self.fallback_solver.solve(unarymatch_dict, binarymatch_dict, V)
+        
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        attributed = self._attribute(binary, V)
+        
+        # incumbent
+        alignmat_best, lower_bound, _ = AssignmentSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        
+        # optimistic score of every node, and of all nodes from t on
+        optimistic = unary.copy()
+        for t, (_, _, target_later, w) in enumerate(attributed):
+            np.add.at(optimistic[t], target_later, w)
+        remaining = np.concatenate([np.cumsum(optimistic.max(axis=1)[::-1])[::-1], [0.0]])
+
+        # partial alignments of nodes 0..t-1, their score and used targets
+        states = np.zeros((1, 0), dtype=int)
+        scores = np.zeros(1)
+        used = np.zeros((1, V), dtype=bool)
+        
+        for t in range(V):
+            
+            # scores of assigning t -> j, for every state and j
+            gains = np.repeat(unary[t][None, :], states.shape[0], axis=0)
+            other, target_other, target_later, w = attributed[t]
+            if w.shape[0]:
+                # self-loops (other == t) are completed iff t -> target_later == target_other
+                is_loop = other == t
+                completed = np.ones((states.shape[0], w.shape[0]), dtype=bool)
+                completed[:, ~is_loop] = states[:, other[~is_loop]] == target_other[~is_loop]
+                w_to_target = np.zeros((w.shape[0], V))
+                w_to_target[np.arange(w.shape[0]), target_later] = np.where(
+                        ~is_loop | (target_later == target_other), w, 0.0)
+                gains += completed.astype(float) @ w_to_target
+            
+            children = scores[:, None] + gains
+            
+            # prune used targets and children that can't beat the incumbent
+            viable = ~used & (children + remaining[t + 1] > lower_bound + 1e-9)
+            parent, target = np.nonzero(viable)
+            if parent.shape[0] == 0:
+                # incumbent is optimal
+                return alignmat_best, lower_bound, lower_bound
+            
+            states = np.concatenate([states[parent], target[:, None]], axis=1)
+            scores = children[parent, target]
+            used = used[parent]
+            used[np.arange(parent.shape[0]), target] = True
+        
+        best = np.argmax(scores)
+        alignmat_best = states[best]
+        lower_bound = util.score_arrays(alignmat_best, unary, binary)
+        return alignmat_best, lower_bound, lower_bound
+
+
+class TreeDPSolver(interfaces.Solver):
+    """Class that solves alignment problems with a Lagrangian branch and bound, 
+       where bounds come from dynamic programming over a spanning forest of V
+
+        Nodes of V interact if there is a binary match between them. For a 
+        spanning forest of this interaction graph, the best alignment (with 
+        targets that may be used more than once) is found by max-sum dynamic 
+        programming from the leaves to the roots, in the style of tree matching. 
+        Every node can also choose a null target, which stands for any target 
+        without matches. Interactions that are not in the forest (reentrancies) 
+        are added optimistically to one of their nodes. 
+        
+        That every target is used at most once is relaxed with Lagrangian 
+        prices of targets, which are updated with subgradient steps. If the DP 
+        solution is injective and consistent on the reentrancies, it is optimal 
+        (up to the prices of unused targets). Else we branch and bound: on a 
+        target that is used by several nodes (at most one of them gets it), or 
+        on the target of a reentrant node (fixed vs. forbidden). 
+        
+        This is not polynomial, also not for trees: the injectivity of the 
+        alignment makes the problem hard. If the search finishes, the alignment 
+        is optimal, else (after max_nodes) we fall back to the ILP. This pays off 
+        when the two graphs are similar, then the DP optimum usually is injective
+        and the search ends at the root. For dissimilar graphs the fallback is 
+        frequent, then solving the ILP right away is faster.
+
+        Attributes:
+            max_nodes (int): maximum number of branch-and-bound nodes
+            max_iters (int): maximum number of subgradient steps per node
+            fallback_solver (Solver): solver used if max_nodes is exceeded, None: ILP
+    """
+
+    def __init__(self, max_nodes=20, max_iters=50, fallback_solver=None):
+        self.max_nodes = max_nodes
+        self.max_iters = max_iters
+        self._fallback_solver = fallback_solver
+        self.hc = VectorizedHillClimber()
+        return None
+
+    @property
+    def fallback_solver(self):
+        # created on first use, so that mip is only needed for large problems
+        if self._fallback_solver is None:
+            self._fallback_solver = ILP()
+        return self._fallback_solver
+
+    @fallback_solver.setter
+    def fallback_solver(self, solver):
+        self._fallback_solver = solver
+
+    @staticmethod
+    def get_interactions(binary):
+        """Get pairs of different nodes of V that have binary matches
+
+            Args:
+                binary (tuple): COO binary scores (i, j, k, l, score)
+
+            Returns:
+                2d array with one row (a, b), a < b, per interacting pair
+        """
+        
+        i, _, k, _, _ = binary
+        sel = i != k
+        pairs = np.stack([np.minimum(i[sel], k[sel]), np.maximum(i[sel], k[sel])], axis=1)
+        return np.unique(pairs.reshape(-1, 2), axis=0)
+
+    @staticmethod
+    def get_spanning_forest(interactions, V):
+        """Get a BFS spanning forest of the interaction graph
+
+            Args:
+                interactions (2d array): pairs of interacting nodes
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                order (list of nodes in BFS order), parent (list, -1 for roots), 
+                reentrancies (list of interacting pairs that are not in the forest,
+                the later node in BFS order is second)
+        """
+
+        neighbors = [[] for _ in range(V)]
+        for a, b in interactions:
+            neighbors[a].append(b)
+            neighbors[b].append(a)
+        
+        parent = [-1] * V
+        rank = [-1] * V
+        order = []
+        for root in range(V):
+            if rank[root] >= 0:
+                continue
+            rank[root] = len(order)
+            order.append(root)
+            head = len(order) - 1
+            while head < len(order):
+                node = order[head]
+                head += 1
+                for other in neighbors[node]:
+                    if rank[other] < 0:
+                        rank[other] = len(order)
+                        order.append(other)
+                        parent[other] = node
+        
+        reentrancies = []
+        for a, b in interactions:
+            if parent[a] == b or parent[b] == a:
+                continue
+            reentrancies.append((a, b) if rank[a] < rank[b] else (b, a))
+        return order, parent, reentrancies
+
+    @staticmethod
+    def count_reentrancies(binarymatch_dict, V):
+        """Number of interactions that don't fit into a spanning forest (0 for trees)"""
+
+        interactions = TreeDPSolver.get_interactions(util.binarymatch_arrays(binarymatch_dict))
+        _, _, reentrancies = TreeDPSolver.get_spanning_forest(interactions, V)
+        return len(reentrancies)
+
+    def _prepare(self, unary, binary, V):
+        
+        i, j, k, l, w = binary
+        profits = get_assignment_profits(unary, binary, V)
+        
+        # candidate targets of every node, the last candidate is null (-1)
+        candidates = []
+        position = np.zeros((V, V), dtype=int)
+        for node in range(V):
+            targets = np.flatnonzero(profits[node] > 0)
+            candidates.append(np.concatenate([targets, [-1]]))
+            position[node] = targets.shape[0]
+            position[node, targets] = np.arange(targets.shape[0])
+        
+        # scores of single nodes, including self-loops
+        # (matches i -> j, i -> l with j != l, or i -> j, k -> j can never be scored)
+        values = [np.concatenate([unary[node, cands[:-1]], [0.0]]) for node, cands in enumerate(candidates)]
+        loop = (i == k) & (j == l)
+        for a, ja, wa in zip(i[loop], j[loop], w[loop]):
+            values[a][position[a, ja]] += wa
+        
+        # score matrices of interacting nodes (a, b), a < b: candidates of a x candidates of b
+        valid = (i != k) & (j != l)
+        a, ja, b, jb = i[valid], j[valid], k[valid], l[valid]
+        swap = a > b
+        a, b, ja, jb = np.where(swap, b, a), np.where(swap, a, b), np.where(swap, jb, ja), np.where(swap, ja, jb)
+        w = w[valid]
+        matrices = {}
+        for pair in self.get_interactions(binary):
+            pa, pb = int(pair[0]), int(pair[1])
+            matrices[(pa, pb)] = np.zeros((candidates[pa].shape[0], candidates[pb].shape[0]))
+        keys = a * V + b
+        order = np.argsort(keys, kind="stable")
+        keys_unique, starts = np.unique(keys[order], return_index=True)
+        for key, sel in zip(keys_unique, np.split(order, starts[1:])):
+            pa, pb = divmod(int(key), V)
+            np.add.at(matrices[(pa, pb)], (position[pa, ja[sel]], position[pb, jb[sel]]), w[sel])
+        
+        return candidates, values, matrices
+
+    @staticmethod
+    def _get_matrix(matrices, a, b):
+        """Score matrix of interacting nodes, candidates of a x candidates of b"""
+        if a < b:
+            return matrices[(a, b)]
+        return matrices[(b, a)].T
+
+    def _solve_dp(self, values, matrices, forest, allowed, candidates, prices):
+        """Max-sum dynamic programming over the spanning forest
+
+            Args:
+                values (list): scores of the candidates of every node
+                matrices (dict): score matrices of interacting nodes
+                forest (tuple): order, parent, reentrancies
+                allowed (list): boolean masks of allowed candidates of every node
+                candidates (list): candidate targets of every node (-1: null)
+                prices (array): Lagrangian prices of targets
+
+            Returns:
+                candidate index of every node, upper bound (-inf if infeasible)
+        """
+
+        order, parent, reentrancies = forest
+        prices_null = np.append(prices, 0.0)
+        value = [np.where(allowed[node], values[node] - prices_null[candidates[node]], -np.inf) 
+                    for node in range(len(values))]
+        
+        # reentrancies: best score for every candidate, over allowed candidates of the later node
+        for a, b in reentrancies:
+            matrix = self._get_matrix(matrices, a, b)
+            value[a] = value[a] + np.where(allowed[b][None, :], matrix, -np.inf).max(axis=1)
+        
+        # leaves to roots
+        choice = {}
+        for node in reversed(order):
+            if parent[node] < 0:
+                continue
+            scores = self._get_matrix(matrices, parent[node], node) + value[node][None, :]
+            choice[node] = scores.argmax(axis=1)
+            value[parent[node]] = value[parent[node]] + scores.max(axis=1)
+        
+        # roots to leaves
+        upper_bound = prices.sum()
+        selected = [0] * len(values)
+        for node in order:
+            if parent[node] < 0:
+                selected[node] = int(np.argmax(value[node]))
+                upper_bound += value[node][selected[node]]
+            else:
+                selected[node] = int(choice[node][selected[parent[node]]])
+        return selected, upper_bound
+
+    @staticmethod
+    def _complete(targets, V):
+        """Make targets injective (first user keeps a target) and assign 
+           free targets to nodes without target"""
+        
+        alignmat = np.array(targets, dtype=int)
+        used = np.zeros(V, dtype=bool)
+        for node, target in enumerate(targets):
+            if target >= 0:
+                if used[target]:
+                    alignmat[node] = -1
+                used[target] = True
+        free = np.flatnonzero(~used)
+        unassigned = np.flatnonzero(alignmat < 0)
+        alignmat[unassigned] = free[:unassigned.shape[0]]
+        return alignmat
+
+    @staticmethod
+    def _round_bound(bound, scale):
+        """Round down an upper bound if all scores are multiples of 1 / scale"""
+        if scale is None or not np.isfinite(bound):
+            return bound
+        return math.floor(bound * scale + 1e-6) / scale
+
+    def _branch(self, selected, targets, candidates, matrices, forest, allowed):
+        """Split a branch-and-bound node into children that cover all its alignments"""
+
+        # a target that is used by several nodes: one of them gets it, or none
+        users = {}
+        for node, target in enumerate(targets):
+            if target >= 0:
+                users.setdefault(target, []).append(node)
+        conflicts = [nodes for nodes in users.values() if len(nodes) > 1]
+        if conflicts:
+            nodes = max(conflicts, key=len)
+            target = targets[nodes[0]]
+            children = []
+            for winner in nodes + [None]:
+                child = list(allowed)
+                for node in nodes:
+                    if node != winner:
+                        child[node] = child[node].copy()
+                        child[node][candidates[node] == target] = False
+                children.append(child)
+            return children
+        
+        # reentrant node whose optimistic score differs most from the actual score
+        _, _, reentrancies = forest
+        gaps = Counter()
+        for a, b in reentrancies:
+            if allowed[b].sum() == 1:
+                continue
+            matrix = self._get_matrix(matrices, a, b)
+            optimistic = np.where(allowed[b], matrix[selected[a]], -np.inf).max()
+            gaps[b] += optimistic - matrix[selected[a], selected[b]]
+        if not gaps or gaps.most_common(1)[0][1] <= 1e-9:
+            return []
+        node = gaps.most_common(1)[0][0]
+        fixed, forbidden = list(allowed), list(allowed)
+        fixed[node] = np.zeros_like(allowed[node])
+        fixed[node][selected[node]] = True
+        forbidden[node] = allowed[node].copy()
+        forbidden[node][selected[node]] = False
+        return [fixed, forbidden]
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        import heapq
+        
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        candidates, values, matrices = self._prepare(unary, binary, V)
+        forest = self.get_spanning_forest(self.get_interactions(binary), V)
+        scale = get_integral_scale(np.concatenate([unary.reshape(-1), binary[4]]))
+        
+        # incumbent
+        alignmat_best, lower_bound, _ = AssignmentSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        
+        # best first search, children are stored with the upper bound and prices of their parent
+        prices = np.zeros(V)
+        heap = [(-np.inf, 0, [np.ones(c.shape[0], dtype=bool) for c in candidates], prices)]
+        n_nodes = 0
+        n_pushed = 1
+        while heap:
+            parent_bound, _, allowed, prices = heapq.heappop(heap)
+            if -parent_bound <= lower_bound + 1e-9:
+                continue
+            
+            n_nodes += 1
+            if n_nodes > self.max_nodes:
+                logger.debug("tree DP exceeded {} branch-and-bound nodes, falling back".format(self.max_nodes))
+                return self.fallback_solver.solve(unarymatch_dict, binarymatch_dict, V)
+            
+            # subgradient steps on the prices of targets (Polyak step size, 
+            # halved if the bound didn't improve for some steps)
+            node_bound, node_prices = -parent_bound, prices
+            node_alignmat, node_score = alignmat_best, lower_bound
+            theta, stall = 1.0, 0
+            for _ in range(self.max_iters):
+                selected, upper_bound = self._solve_dp(values, matrices, forest, allowed, candidates, prices)
+                upper_bound = self._round_bound(upper_bound, scale)
+                if upper_bound < node_bound:
+                    node_bound, node_prices, stall = upper_bound, prices, 0
+                else:
+                    stall += 1
+                    if stall >= 5:
+                        theta, stall = theta / 2, 0
+                if node_bound <= lower_bound + 1e-9:
+                    break
+                
+                targets = np.array([candidates[node][selected[node]] for node in range(V)])
+                alignmat = self._complete(targets, V)
+                score = util.score_arrays(alignmat, unary, binary)
+                if score > node_score:
+                    node_alignmat, node_score = alignmat, score
+                
+                # subgradient: number of users - 1, projected on prices >= 0
+                subgradient = np.bincount(targets[targets >= 0], minlength=V) - 1.0
+                subgradient[(prices <= 0) & (subgradient < 0)] = 0.0
+                if not subgradient.any():
+                    break
+                step = theta * (upper_bound - max(lower_bound, node_score)) / (subgradient ** 2).sum()
+                prices = np.maximum(prices + step * subgradient, 0.0)
+            
+            # improve the best alignment of this node with hill-climbing
+            if node_bound > lower_bound + 1e-9:
+                alignmat, score = self.hc._climb(unary, binary, V, np.array(node_alignmat, dtype=int))
+                if score > lower_bound:
+                    alignmat_best, lower_bound = alignmat, score
+            
+            if node_bound <= lower_bound + 1e-9:
+                continue
+            
+            # branch on the DP solution with the best prices, if it is injective and consistent 
+            # (but prices of unused targets are left), on the DP solution without prices
+            children = []
+            for branch_prices in [node_prices, np.zeros(V)]:
+                selected, upper_bound = self._solve_dp(values, matrices, forest, allowed, candidates, branch_prices)
+                node_bound = min(node_bound, self._round_bound(upper_bound, scale))
+                targets = [int(candidates[node][selected[node]]) for node in range(V)]
+                children = self._branch(selected, targets, candidates, matrices, forest, allowed)
+                if children:
+                    break
+                alignmat = self._complete(targets, V)
+                score = util.score_arrays(alignmat, unary, binary)
+                if score > lower_bound:
+                    alignmat_best, lower_bound = alignmat, score
+            
+            for child in children:
+                heapq.heappush(heap, (-node_bound, n_pushed, child, node_prices))
+                n_pushed += 1
+        
+        logger.debug("tree DP solved with {} branch-and-bound nodes".format(n_nodes))
+        return alignmat_best, lower_bound, lower_bound
+
+
+class PruningSolver(interfaces.Solver):
+    """Class that prunes candidate pairs before solving an alignment problem
+
+        For every node, only the k partners with the highest optimistic profit 
+        (unary score plus best possible binary scores) are kept, on both sides. 
+        The reduced problem is solved by another solver. The upper bound covers 
+        what pruning may have lost: a pruned pair can add at most its unary 
+        score and both halves of its best binary matches, so we add the best 
+        assignment of pruned pairs under these profits to the upper bound of 
+        the reduced problem.
+
+        Attributes:
+            solver (Solver): solver for the reduced problem, None: sparse ILP
+            k (int): number of partners that are kept per node
+    """
+
+    def __init__(self, solver=None, k=10):
+        
+        self.solver = solver
+        if not self.solver:
+            self.solver = ILP(model_factory=MIPModelFactory(sparse=True, linking="aggregated_columns", 
+                                                            integral_objective=True))
+        self.k = k
+        
+        from scipy.optimize import linear_sum_assignment
+        self._linear_sum_assignment = linear_sum_assignment
+        return None
+
+    def get_kept_pairs(self, profits):
+        """Select the top-k partners of every node (of V and of V')
+
+            Args:
+                profits (2d array): optimistic profits of pairs
+
+            Returns:
+                VxV boolean array, True if pair is kept
+        """
+        
+        V = profits.shape[0]
+        k = min(self.k, V)
+        rows = np.arange(V)[:, None]
+        keep = np.zeros((V, V), dtype=bool)
+        keep[rows, np.argsort(-profits, axis=1, kind="stable")[:, :k]] = True
+        keep[np.argsort(-profits, axis=0, kind="stable")[:k, :], rows.T] = True
+        return keep & (profits > 0)
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        profits = get_assignment_profits(unary, binary, V)
+        keep = self.get_kept_pairs(profits)
+        
+        # reduced problem
+        unary_reduced = Counter({(i, j): score for (i, j), score in unarymatch_dict.items() if keep[i, j]})
+        binary_reduced = Counter({(i, j, k, l): score for (i, j, k, l), score in binarymatch_dict.items() 
+                                    if keep[i, j] and keep[k, l]})
+        logger.debug("kept {} of {} candidate pairs".format(keep.sum(), (profits > 0).sum()))
+        
+        alignmat, _, upper_bound = self.solver.solve(unary_reduced, binary_reduced, V)
+        lower_bound = util.score_arrays(alignmat, unary, binary)
+        
+        # what pruned pairs can add at most: unary and binary matches in both directions
+        pruned_profits = np.where(keep, 0.0, 2 * profits - unary)
+        rows, cols = self._linear_sum_assignment(pruned_profits, maximize=True)
+        upper_bound += float(pruned_profits[rows, cols].sum())
+        upper_bound = min(upper_bound, assignment_upper_bound_arrays(unary, binary, V))
+        
+        return alignmat, lower_bound, max(upper_bound, lower_bound)
+
+
+class CachedSolver(interfaces.Solver):
+    """Class that memoizes the solutions of another solver
+
+        Alignment problems are identified by a canonical hash of the
+        match dictionaries, so the same problem (e.g., from duplicate graph pairs)
+        is solved only once. The least recently used problems are evicted first.
+        Solutions that are not proven optimal are not stored, so that the problem
+        can be solved again (e.g., with more time).
+
+        Attributes:
+            solver (Solver): the solver that is wrapped
+            maxsize (int): maximum number of stored solutions
+            log_every (int): log the hit rate after this many lookups
+    """
+
+    def __init__(self, solver, maxsize=10000, log_every=100):
+        self.solver = solver
+        self.maxsize = maxsize
+        self.log_every = log_every
+        self.cache = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        return None
+
+    @property
+    def hit_rate(self):
+        if not self.lookups:
+            return 0.0
+        return self.hits / self.lookups
+
+    @staticmethod
+    def _get_key(unarymatch_dict, binarymatch_dict, V):
+        """Canonical hash of an alignment problem"""
+        data = (V, sorted(unarymatch_dict.items()), sorted(binarymatch_dict.items()))
+        return hashlib.sha1(repr(data).encode("utf-8")).hexdigest()
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        key = self._get_key(unarymatch_dict, binarymatch_dict, V)
+        self.lookups += 1
+        
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            alignmat, lower_bound, upper_bound = self.cache[key]
+            logger.debug("alignment problem found in cache")
+        else:
+            alignmat, lower_bound, upper_bound = self.solver.solve(unarymatch_dict, binarymatch_dict, V)
+            if upper_bound - lower_bound <= 1e-6:
+                self.cache[key] = (alignmat.copy(), lower_bound, upper_bound)
+                if len(self.cache) > self.maxsize:
+                    self.cache.popitem(last=False)
+        
+        if self.lookups % self.log_every == 0:
+            logger.info("alignment cache lookups: {}; hit rate: {:.3f}".format(self.lookups, self.hit_rate))
+        
+        return alignmat.copy(), lower_bound, upper_bound
+
+
+def get_components(unarymatch_dict, binarymatch_dict, V):
+    """Splits an alignment problem into independent sub-problems
+
+        Nodes of the two graphs are connected if they form a candidate pair, and nodes
+        of the same graph are connected if they are part of the same binary match. 
+        Connected components of this graph can be aligned independently.
+
+        Args:
+            unarymatch_dict (dict): scores of unary alignments 
+            binarymatch_dict (dict): scores of binary alignments
+            V (int): max(nodes V, nodes V')
+
+        Returns:
+            list with components, each is a tuple (nodes from V, nodes from V', 
+            unary match dict, binary match dict) where indices are relative to the component
+    """
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    # nodes of V are 0...V-1, nodes of V' are V...2V-1
+    src = [i for (i, j) in unarymatch_dict]
+    tgt = [V + j for (i, j) in unarymatch_dict]
+    for (i, j, k, l) in binarymatch_dict:
+        src += [i, k, i]
+        tgt += [V + j, V + l, k]
+    if not src:
+        return []
+
+    graph = coo_matrix((np.ones(len(src)), (src, tgt)), shape=(2 * V, 2 * V))
+    _, labels = connected_components(graph, directed=False)
+    
+    # gather nodes of components
+    nodes = {}
+    for i in sorted(set(src + tgt)):
+        nodes.setdefault(labels[i], ([], []))
+        if i < V:
+            nodes[labels[i]][0].append(i)
+        else:
+            nodes[labels[i]][1].append(i - V)
+    
+    # gather match dicts of components with component-specific indices
+    components = {}
+    for label, (left, right) in nodes.items():
+        components[label] = (left, right, Counter(), Counter())
+    index_left = {i: idx for (left, _) in nodes.values() for idx, i in enumerate(left)}
+    index_right = {j: idx for (_, right) in nodes.values() for idx, j in enumerate(right)}
+    for (i, j), score in unarymatch_dict.items():
+        components[labels[i]][2][(index_left[i], index_right[j])] = score
+    for (i, j, k, l), score in binarymatch_dict.items():
+        key = (index_left[i], index_right[j], index_left[k], index_right[l])
+        components[labels[i]][3][key] = score
+    
+    return list(components.values())
+
+
+class DecomposedSolver(interfaces.Solver):
+    """Class that splits alignment problems into independent components and
+       solves each component on its own
+
+        Attributes:
+            exact_solver (Solver): solver for components with at most max_exact_size nodes
+            cheap_solver (Solver): solver for larger components
+            max_exact_size (int): largest component that is solved with the exact solver,
+                                  None: all components are solved with the exact solver
+    """
+
+    def __init__(self, exact_solver=None, cheap_solver=None, max_exact_size=None):
+        
+        self.exact_solver = exact_solver
+        if not self.exact_solver:
+            self.exact_solver = ILP()
+        
+        self.cheap_solver = cheap_solver
+        if not self.cheap_solver:
+            self.cheap_solver = VectorizedHillClimber()
+
+        self.max_exact_size = max_exact_size
+        return None
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        components = get_components(unarymatch_dict, binarymatch_dict, V)
+        logger.debug("alignment problem split into {} components".format(len(components)))
+        return self._solve_components(components, V)
+
+    @staticmethod
+    def is_trivial(left, right):
+        """Check if a component has only one candidate pair"""
+        return len(left) == 1 and len(right) == 1
+
+    def _solve_components(self, components, V):
+        """Solve components and stitch their alignments together
+
+            Args:
+                components (list): components as returned by get_components
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                alignmat, lower bound, upper bound
+        """
+        
+        alignmat = -np.ones(V, dtype=int)
+        lower_bound = 0.0
+        upper_bound = 0.0
+
+        for left, right, unary, binary in components:
+            
+            # only one candidate pair, so nothing to do
+            if self.is_trivial(left, right):
+                alignmat[left[0]] = right[0]
+                score = unary[(0, 0)] + binary[(0, 0, 0, 0)]
+                lower_bound += score
+                upper_bound += score
+                continue
+            
+            # solve component
+            Vc = max(len(left), len(right))
+            sub_alignmat, sub_lower_bound, sub_upper_bound = self._solve_component(unary, binary, Vc)
+            
+            # stitch alignments together
+            for i, j in enumerate(sub_alignmat):
+                if i < len(left) and 0 <= j < len(right):
+                    alignmat[left[i]] = right[int(j)]
+            lower_bound += sub_lower_bound
+            upper_bound += sub_upper_bound
+        
+        return alignmat, lower_bound, upper_bound
+
+    def _solve_component(self, unarymatch_dict, binarymatch_dict, V):
+        """Solve one component, with the exact solver if it is small enough"""
+        
+        solver = self.exact_solver
+        if self.max_exact_size is not None and V > self.max_exact_size:
+            solver = self.cheap_solver
+        return solver.solve(unarymatch_dict, binarymatch_dict, V)
+
+
+class AutoSolver(DecomposedSolver):
+    """Class that selects a solver for every component of an alignment problem
+
+        Components are routed to the cheapest solver that guarantees optimality:
+        linear assignment if there are no binary matches, enumeration if they are 
+        tiny, and certified ILP if they are not too large. Else we fall back to a 
+        Lagrangian relaxation heuristic that has a time limit and an upper bound.
+        Tree DP (branch and bound) can be enabled for components that (almost) are 
+        trees, it is only faster than the ILP if the graphs are similar.
+
+        Attributes:
+            max_enumeration_size (int): largest component that is enumerated
+            max_tree_reentrancies (int): maximum number of reentrancies for tree DP, 
+                                         None: no tree DP
+            max_ilp_size (int): largest component that is solved with ILP
+            max_ilp_binaries (int): maximum number of binary matches for ILP
+            ilp_seconds (int): time limit of the ILP (per component)
+            heuristic_seconds (int): time limit of the heuristic (per component)
+            max_seconds (float): time limit per problem (e.g., set by TimeBudgetScheduler),
+                                 it is split over the components that need the ILP 
+                                 or the heuristic, None: only ilp_seconds and heuristic_seconds
+            model_factory (MIPModelFactory): builds the ILP models
+            log_every (int): log route counts after this many problems
+            routes (Counter): number of components per route
+            pair_routes (Counter): number of problems per route (most expensive
+                                   route over their components)
+    """
+
+    ROUTE_ORDER = ["trivial", "assignment", "enumeration", "tree", "ilp", "heuristic"]
+    
+    # routes that may use a time limit (tree DP falls back to the ILP)
+    TIMED_ROUTES = ["tree", "ilp", "heuristic"]
+
+    def __init__(self, max_enumeration_size=8, max_tree_reentrancies=None, max_ilp_size=100, 
+                    max_ilp_binaries=20000, ilp_seconds=240, heuristic_seconds=15, log_every=100):
+        
+        self.model_factory = MIPModelFactory(linking="aggregated_columns", integral_objective=True)
+        ilp = CertifiedILP(max_seconds=ilp_seconds, model_factory=self.model_factory)
+        DecomposedSolver.__init__(self, exact_solver=ilp, cheap_solver=RILPHC(max_seconds=heuristic_seconds), 
+                                    max_exact_size=max_ilp_size)
+        
+        self.max_enumeration_size = max_enumeration_size
+        self.max_tree_reentrancies = max_tree_reentrancies
+        self.max_ilp_size = max_ilp_size
+        self.max_ilp_binaries = max_ilp_binaries
+        self.ilp_seconds = ilp_seconds
+        self.heuristic_seconds = heuristic_seconds
+        self.max_seconds = None
+        self.log_every = log_every
+        self.solvers = {"assignment": AssignmentSolver(),
+                        "enumeration": EnumerationSolver(max_size=max_enumeration_size),
+                        "ilp": self.exact_solver,
+                        "heuristic": self.cheap_solver}
+        self.solvers["tree"] = TreeDPSolver(fallback_solver=self.solvers["ilp"])
+        self.routes = Counter()
+        self.pair_routes = Counter()
+        self._current_routes = []
+        self._planned_routes = []
+        self._deadline = None
+        return None
+    
+    def get_route(self, unarymatch_dict, binarymatch_dict, V):
+        """Select a route for an alignment problem
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                route (string)
+        """
+        
+        if not binarymatch_dict:
+            return "assignment"
+        if V <= self.max_enumeration_size:
+            return "enumeration"
+        if V <= self.max_ilp_size and len(binarymatch_dict) <= self.max_ilp_binaries:
+            if (self.max_tree_reentrancies is not None 
+                    and TreeDPSolver.count_reentrancies(binarymatch_dict, V) <= self.max_tree_reentrancies):
+                return "tree"
+            return "ilp"
+        return "heuristic"
+
+    def _get_timed_solver(self, route):
+        """Get the solver of a route that may use a time limit, the time left 
+           for the problem is split evenly over its components that may need it
+
+            Args:
+                route (string): one of TIMED_ROUTES
+
+            Returns:
+                solver (Solver): the shared solver of the route if there is no 
+                                 deadline, else a new solver with a time limit 
+                                 for this component
+        """
+        
+        if self._deadline is None:
+            return self.solvers[route]
+        n_timed = 1 + sum(planned in self.TIMED_ROUTES for planned in self._planned_routes)
+        share = max(self._deadline - time.time(), 0.01) / n_timed
+        if route == "heuristic":
+            return RILPHC(max_seconds=min(self.heuristic_seconds, share))
+        ilp = CertifiedILP(max_seconds=min(self.ilp_seconds, share), model_factory=self.model_factory)
+        if route == "tree":
+            return TreeDPSolver(fallback_solver=ilp)
+        return ilp
+
+    def _solve_component(self, unarymatch_dict, binarymatch_dict, V):
+        
+        route = None
+        if self._planned_routes:
+            route = self._planned_routes.pop(0)
+        else:
+            route = self.get_route(unarymatch_dict, binarymatch_dict, V)
+        self._current_routes.append(route)
+        solver = self.solvers.get(route)
+        if route in self.TIMED_ROUTES:
+            solver = self._get_timed_solver(route)
+        return solver.solve(unarymatch_dict, binarymatch_dict, V)
+    
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        self._current_routes = []
+        self._deadline = None
+        if self.max_seconds is not None:
+            self._deadline = time.time() + self.max_seconds
+        
+        # routes of all components are planned first, so that we know how 
+        # many components share the time limit
+        components = get_components(unarymatch_dict, binarymatch_dict, V)
+        self._planned_routes = [self.get_route(unary, binary, max(len(left), len(right))) 
+                                    for left, right, unary, binary in components 
+                                    if not self.is_trivial(left, right)]
+        result = self._solve_components(components, V)
+        
+        # record routes
+        self.routes.update(self._current_routes)
+        pair_route = max(self._current_routes + ["trivial"], key=self.ROUTE_ORDER.index)
+        self.pair_routes[pair_route] += 1
+        
+        n = sum(self.pair_routes.values())
+        if self.log_every and n % self.log_every == 0:
+            logger.info("solver routes after {} problems: {}".format(n, self.route_summary()))
+        return result
+
+    def route_summary(self):
+        """Number of problems per route, as string"""
+        return ", ".join("{}: {}".format(route, self.pair_routes[route]) 
+                            for route in self.ROUTE_ORDER if self.pair_routes[route])
+
+
+class TimeBudgetScheduler(interfaces.Solver):
+    """Class that distributes a total time budget over the alignment problems of a corpus
+
+        Every problem gets a time limit that depends on the time that is left, 
+        the number of problems that are left, and the size of the problem 
+        compared to the problems seen so far. Time that easy problems do not 
+        use is available for the problems that follow.
+
+        Attributes:
+            solver (Solver): the solver that is wrapped, it (or solvers that it wraps) 
+                             must have a max_seconds attribute
+            time_budget (float): total seconds for all problems
+            min_seconds (float): minimum time limit for a problem, as long as 
+                                 there is time left
+            max_seconds (float): maximum time limit for a problem, None: the 
+                                 initial max_seconds of the wrapped solver
+    """
+
+    def __init__(self, solver, time_budget, min_seconds=1.0, max_seconds=None):
+        
+        self.solver = solver
+        self.time_budget = time_budget
+        self.min_seconds = min_seconds
+        
+        # the solvers that we set the time limit for
+        self.timed_solvers = self.get_timed_solvers(solver)
+        if not self.timed_solvers:
+            logger.warning("solver {} has no time limit, time budget has no effect".format(
+                type(solver).__name__))
+        
+        self.max_seconds = max_seconds
+        if self.max_seconds is None:
+            limits = [s.max_seconds for s in self.timed_solvers if s.max_seconds is not None]
+            self.max_seconds = max(limits) if limits else 240
+        
+        self.start(1)
+        return None
+    
+    @staticmethod
+    def get_timed_solvers(solver):
+        """Find the solvers with a time limit: the solver itself, or 
+           the solvers that it wraps (e.g., the ILP of a DecomposedSolver)
+
+            Args:
+                solver (Solver): a solver
+
+            Returns:
+                list with solvers that have a max_seconds attribute
+        """
+        
+        if hasattr(solver, "max_seconds"):
+            return [solver]
+        
+        timed_solvers = []
+        for name in ["solver", "exact_solver", "cheap_solver", "fallback_solver"]:
+            inner = getattr(solver, name, None)
+            if inner is None:
+                continue
+            for timed_solver in TimeBudgetScheduler.get_timed_solvers(inner):
+                if all(timed_solver is not s for s in timed_solvers):
+                    timed_solvers.append(timed_solver)
+        return timed_solvers
+    
+    def start(self, n_problems):
+        """Starts the clock
+
+            Args:
+                n_problems (int): number of problems that we want to solve
+        """
+        self.start_time = time.time()
+        self.problems_left = n_problems
+        self.sizes = []
+        return None
+
+    @property
+    def remaining(self):
+        return self.time_budget - (time.time() - self.start_time)
+
+    def _get_time_limit(self, V):
+        
+        # fair share of remaining time
+        remaining = max(self.remaining, 0.0)
+        share = remaining / max(self.problems_left, 1)
+        
+        # larger problems get more
+        if self.sizes:
+            weight = (V / np.mean(self.sizes)) ** 2
+            share *= min(max(weight, 0.25), 4.0)
+        
+        # never more than what is left, but solvers need some time 
+        # to return their first (heuristic) solution
+        time_limit = min(max(share, self.min_seconds), self.max_seconds, remaining)
+        return max(time_limit, 0.01)
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        time_limit = self._get_time_limit(V)
+        logger.debug("time limit for problem of size {}: {} secs".format(V, time_limit))
+        for timed_solver in self.timed_solvers:
+            timed_solver.max_seconds = time_limit
+        
+        result = self.solver.solve(unarymatch_dict, binarymatch_dict, V)
+        self.sizes.append(V)
+        
+        return result
+
+
+def _portfolio_worker(idx, strategy, unarymatch_dict, binarymatch_dict, V, queue):
+    """Runs one strategy of a portfolio in a worker process"""
+    
+    solver_class, kwargs = strategy
+    try:
+        result = solver_class(**kwargs).solve(unarymatch_dict, binarymatch_dict, V)
+    except Exception as e:
+        logger.warning("portfolio strategy {} failed: {}".format(solver_class.__name__, e))
+        result = None
+    queue.put((idx, result))
+    return None
+
+
+class PortfolioSolver(interfaces.Solver):
+    """Class that runs different solvers in parallel worker processes
+
+        All strategies race on the same problem. As soon as one alignment is proven 
+        optimal (its score equals the tightest upper bound), all workers are stopped.
+        Else, at the deadline, we return the best alignment with the tightest bound. 
+
+        Attributes:
+            max_seconds (int): time limit
+            strategies (list): tuples (solver class, keyword arguments), 
+                               None: ILP, LP and VectorizedHillClimber
+            grace_seconds (float): extra time after max_seconds for the workers 
+                                   to return their results
+    """
+
+    def __init__(self, max_seconds=240, strategies=None, grace_seconds=1.0):
+        
+        self.max_seconds = max_seconds
+        self.strategies = strategies
+        self.grace_seconds = grace_seconds
+        return None
+
+    def _get_strategies(self):
+        if self.strategies is not None:
+            return self.strategies
+        return [(ILP, {"max_seconds": self.max_seconds, "ignore_bad_solution_warning": True}),
+                (LP, {"max_seconds": self.max_seconds, "ignore_bad_solution_warning": True}),
+                (VectorizedHillClimber, {})]
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        import multiprocessing
+        import queue as queue_module
+        
+        strategies = self._get_strategies()
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_portfolio_worker, daemon=True,
+                                    args=(idx, strategy, unarymatch_dict, binarymatch_dict, V, queue)) 
+                    for idx, strategy in enumerate(strategies)]
+        
+        deadline = time.time() + self.max_seconds + self.grace_seconds
+        best = None
+        upper_bound = 10000000
+        
+        try:
+            for worker in workers:
+                worker.start()
+            
+            for _ in workers:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    idx, result = queue.get(timeout=timeout)
+                except queue_module.Empty:
+                    break
+                if result is None:
+                    continue
+                
+                alignmat, lower_bound, tmp_upper_bound = result
+                logger.debug("portfolio strategy {} returned {}, {}".format(
+                    strategies[idx][0].__name__, lower_bound, tmp_upper_bound))
+                upper_bound = min(upper_bound, tmp_upper_bound)
+                if best is None or lower_bound > best[1]:
+                    best = (alignmat, lower_bound)
+                
+                # proven optimal, no need to wait for others
+                if best[1] >= upper_bound - 1e-6:
+                    break
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+        
+        if best is None:
+            logger.warning("no portfolio strategy found an alignment in time ({} secs)".format(self.max_seconds))
+            dummy_alignmat = util.alignmat_compressed(np.zeros((V, V)))
+            return dummy_alignmat, 0.0, 10000000
+        
+        return best[0], best[1], upper_bound
+
+
+def get_symmetric_node_classes(unarymatch_dict, binarymatch_dict, V, max_rounds=10):
+    """Find classes of interchangeable nodes in V
+
+        Two nodes are interchangeable if switching them doesn't change the score of 
+        any alignment, i.e., all their unary and binary matches are the same. Then, 
+        for every alignment there's an equivalent one where the nodes of a class 
+        are aligned in increasing order. Candidates are found by Weisfeiler-Lehman 
+        style color refinement over the matches and then checked exactly.
+
+        Args:
+            unarymatch_dict (dict): scores of unary alignments 
+            binarymatch_dict (dict): scores of binary alignments
+            V (int): max(nodes V, nodes V')
+            max_rounds (int): maximum number of refinement rounds
+
+        Returns:
+            list with classes (sorted lists of nodes), only classes with > 1 node
+    """
+    
+    # matches of every node
+    unary_of = [[] for _ in range(V)]
+    for (i, j), score in unarymatch_dict.items():
+        unary_of[i].append((j, score))
+    binary_of = [[] for _ in range(V)]
+    incident = [[] for _ in range(V)]
+    for (i, j, k, l), score in binarymatch_dict.items():
+        binary_of[i].append((j, k, l, score))
+        incident[i].append((i, j, k, l))
+        if k != i:
+            incident[k].append((i, j, k, l))
+    
+    # color refinement, initial color from unary matches
+    colors = [hash(tuple(sorted(unary_of[i]))) for i in range(V)]
+    n_colors = len(set(colors))
+    for _ in range(max_rounds):
+        colors = [hash((colors[i], tuple(sorted((j, l, score, colors[k]) for j, k, l, score in binary_of[i]))))
+                    for i in range(V)]
+        n_colors_new = len(set(colors))
+        if n_colors_new == n_colors:
+            break
+        n_colors = n_colors_new
+    
+    candidates = {}
+    for i in range(V):
+        candidates.setdefault(colors[i], []).append(i)
+    
+    def is_transposition_symmetric(a, c):
+        if sorted(unary_of[a]) != sorted(unary_of[c]):
+            return False
+        swap = {a: c, c: a}
+        for (i, j, k, l) in incident[a] + incident[c]:
+            if binarymatch_dict.get((swap.get(i, i), j, swap.get(k, k), l), 0.0) != binarymatch_dict[(i, j, k, l)]:
+                return False
+        return True
+
+    # check candidates exactly, transpositions with the first node generate all permutations
+    classes = []
+    for nodes in candidates.values():
+        while len(nodes) > 1:
+            first = nodes[0]
+            same = [first] + [c for c in nodes[1:] if is_transposition_symmetric(first, c)]
+            if len(same) > 1:
+                classes.append(same)
+            nodes = [c for c in nodes if c not in same]
+    return classes
+
+
+def merge_symmetric_nodes(unarymatch_dict, binarymatch_dict, classes, V):
+    """Merge classes of interchangeable nodes of V into single nodes
+
+        A merged node can be aligned to as many nodes of V' as its class has members.
+        Since the members are interchangeable, any distribution of these partners 
+        over the members gives the same score. We only merge classes without 
+        binary matches between their members.
+
+        Args:
+            unarymatch_dict (dict): scores of unary alignments 
+            binarymatch_dict (dict): scores of binary alignments
+            classes (list): classes of interchangeable nodes
+            V (int): max(nodes V, nodes V')
+
+        Returns:
+            groups (list): members of every merged node
+            unarymatch_dict (dict): scores of unary alignments of merged nodes
+            binarymatch_dict (dict): scores of binary alignments of merged nodes
+    """
+    
+    # no merge if class has internal binary matches
+    internal = set()
+    class_of = {node: idx for idx, nodes in enumerate(classes) for node in nodes}
+    for (i, _, k, _) in binarymatch_dict:
+        if i in class_of and class_of[i] == class_of.get(k):
+            internal.add(class_of[i])
+    
+    groups = [nodes for idx, nodes in enumerate(classes) if idx not in internal]
+    group_of = {node: g for g, nodes in enumerate(groups) for node in nodes}
+    for i in range(V):
+        if i not in group_of:
+            group_of[i] = len(groups)
+            groups.append([i])
+    
+    # members have the same scores, so we can simply overwrite
+    unary = Counter()
+    for (i, j), score in unarymatch_dict.items():
+        unary[(group_of[i], j)] = score
+    binary = Counter()
+    for (i, j, k, l), score in binarymatch_dict.items():
+        binary[(group_of[i], j, group_of[k], l)] = score
+    
+    return groups, unary, binary
+
+
+def invert_alignment(alignmat):
+    """Invert an alignment from V to V' (both of size V), -1 if unaligned"""
+    
+    alignmat = np.asarray(alignmat, dtype=int)
+    inverse = -np.ones(alignmat.shape[0], dtype=int)
+    aligned = np.flatnonzero(alignmat >= 0)
+    inverse[alignmat[aligned]] = aligned
+    return inverse
+
+
+def get_integral_scale(values, max_scale=12):
+    """Find the smallest factor that makes all values integers
+
+        Args:
+            values (list): e.g., coefficients of an objective
+            max_scale (int): largest factor that we try
+
+        Returns:
+            scale (int), None if there is none
+    """
+    
+    values = np.asarray(values, dtype=float)
+    for scale in range(1, max_scale + 1):
+        scaled = values * scale
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-9):
+            return scale
+    return None
+
+
+MIPModelInfo = namedtuple("MIPModelInfo", ["groups", "transposed", "objective_scale"])
+MIPModelInfo.__doc__ = """Per-model data that is needed to read solutions of a model
+
+        Attributes:
+            groups (list): nodes of each merged node (with merge_symmetric), else None
+            transposed (bool): True if nodes of V' were merged instead of nodes of V
+            objective_scale (int): factor that scales the objective to integers, 
+                                   None: objective is not scaled
+"""
+
+
+class MIPModelFactory():
+    """Class that builds (I)LP models for alignment problems
+
+        The factory keeps no data of the models that it built, so one factory 
+        can be shared by solvers. Data that is needed to read solutions 
+        is returned by build_model (MIPModelInfo).
+
+        Attributes:
+            sparse (bool): if True, alignment variables are only created for pairs 
+                           that have unary or binary matches. Other pairs cannot
+                           contribute to the objective and stay unaligned. This also 
+                           means that there's no padding if |V| != |V'|.
+            merge_symmetric (bool): if True, interchangeable nodes (of V or of V', 
+                                    whichever saves more) are merged into one node 
+                                    before building the model, which removes 
+                                    equivalent solutions from the search
+            linking (string): how structural matches y(i, j, k, l) are linked to 
+                              alignments x[i][j] and x[k][l]
+                              "pairwise": y <= x[i][j] and y <= x[k][l]
+                              "aggregated": sum over l of y(i, j, k, l) <= x[i][j] and 
+                                            sum over j of y(i, j, k, l) <= x[k][l], since
+                                            k (i) can only be aligned to one l (j) 
+                              "aggregated_columns": like "aggregated", and additionally 
+                                            sum over k of y(i, j, k, l) <= x[i][j] and 
+                                            sum over i of y(i, j, k, l) <= x[k][l]
+                              The aggregated constraints are fewer and give a tighter
+                              LP relaxation.
+            cuts (int): cut generation of the solver, -1: automatic, 0: off, 
+                        1-3: more and more aggressive, None: solver default
+            integral_objective (bool): if True, and all scores are integers after scaling 
+                                       (e.g., with IDTripleMatcher), the objective is 
+                                       scaled to integers. Then the solver can stop as 
+                                       soon as the gap is below 1, and bounds are 
+                                       rounded down
+    """
+    
+    def __init__(self, sparse=False, merge_symmetric=False, linking="pairwise", cuts=None,
+                    integral_objective=False):
+        try:
+            import mip
+            self.mip = mip
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Module mip not found, please install mip \
+                                       we used version 1.13.0")
+        if linking not in ("pairwise", "aggregated", "aggregated_columns"):
+            raise ValueError("unknown linking \"{}\"".format(linking))
+        self.sparse = sparse
+        self.merge_symmetric = merge_symmetric
+        self.linking = linking
+        self.cuts = cuts
+        self.integral_objective = integral_objective
+
+    def build_model(self, unarymatch_dict, binarymatch_dict, V):
+        """Builds a model
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                model, alignment variables x, MIPModelInfo
+        """
+        
+        # init model
+        model = self.mip.Model()
+        model.verbose = 0
+        model.preprocess = -1
+        if self.cuts is not None:
+            model.cuts = self.cuts
+        
+        capacities = None
+        groups = None
+        transposed = False
+        if self.merge_symmetric:
+            unarymatch_dict, binarymatch_dict, groups, transposed = self._merge(unarymatch_dict, binarymatch_dict, V)
+            capacities = [len(nodes) for nodes in groups]
+        
+        # shortcut
+        ux = unarymatch_dict
+        
+        # prune space by making symmetric match dict to asymetric
+        bx = Counter()
+        for (i, j, k, l) in binarymatch_dict:
+            if (k, l, i, j) in bx:
+                continue
+            bx[(i, j, k, l)] += binarymatch_dict[(i, j, k, l)] + binarymatch_dict[(k, l, i, j)]
+        
+        # scale to integer objective
+        objective_scale = None
+        if self.integral_objective:
+            objective_scale = get_integral_scale(list(ux.values()) + list(bx.values()))
+        if objective_scale is not None:
+            ux = Counter({key: value * objective_scale for key, value in ux.items()})
+            bx = Counter({key: value * objective_scale for key, value in bx.items()})
+            model.max_mip_gap_abs = 0.999
+
+        info = MIPModelInfo(groups, transposed, objective_scale)
+        if self.sparse:
+            model, x = self._build_sparse_model(model, ux, bx, capacities)
+        else:
+            model, x = self._build_dense_model(model, ux, bx, V, capacities)
+        return model, x, info
+
+    def _merge(self, unarymatch_dict, binarymatch_dict, V):
+        
+        # we can merge either nodes of V or of V', we take the side that saves more
+        classes = get_symmetric_node_classes(unarymatch_dict, binarymatch_dict, V)
+        groups, unary, binary = merge_symmetric_nodes(unarymatch_dict, binarymatch_dict, classes, V)
+        
+        unary_t = Counter({(j, i): score for (i, j), score in unarymatch_dict.items()})
+        binary_t = Counter({(j, i, l, k): score for (i, j, k, l), score in binarymatch_dict.items()})
+        classes_t = get_symmetric_node_classes(unary_t, binary_t, V)
+        groups_t, unary_t, binary_t = merge_symmetric_nodes(unary_t, binary_t, classes_t, V)
+        
+        transposed = len(groups_t) < len(groups)
+        if transposed:
+            groups, unary, binary = groups_t, unary_t, binary_t
+        logger.debug("merged {} interchangeable nodes".format(V - len(groups)))
+        return unary, binary, groups, transposed
+
+    def _build_dense_model(self, model, ux, bx, V, capacities=None):
+        
+        Vr = range(V)
+        rows = range(len(capacities)) if capacities else Vr
+        
+        # init binary alignment vars
+        x = [[model.add_var(var_type=self.mip.BINARY) for j in Vr] for i in rows]
+        
+        # init binary match vars for binary structural matches
+        y = {}
+        
+        for (i, j, k, l) in bx:
+            y[(i, j, k, l)] = model.add_var(var_type=self.mip.BINARY)
+        
+        # set model objective
+        model.objective = self.mip.maximize(
+                self.mip.xsum(ux[(i, j)] * x[i][j] for i in rows for j in Vr) 
+                + self.mip.xsum(bx[(i, j, k, l)] * y[(i, j, k, l)] for (i, j, k, l) in bx))
+        
+        # constraints: every var must be aligned only to one other var (or remain unaligned)
+        # merged vars can be aligned to as many vars as they have members
+        for i in rows:
+            model += self.mip.xsum(x[i][j] for j in Vr) <= (capacities[i] if capacities else 1)
+
+        for j in Vr:
+            model += self.mip.xsum(x[i][j] for i in rows) <= 1
+
+        # binary structural match constraint, i.e., if two vars are not aligned, all involved
+        # struct matches must be zero
+        self._add_linking_constraints(model, lambda i, j: x[i][j], y, capacities)
+
+        return model, x
+
+    def _build_sparse_model(self, model, ux, bx, capacities=None):
+        
+        # candidate pairs are all pairs that occur in a match
+        pairs = set(ux.keys())
+        for (i, j, k, l) in bx:
+            pairs.add((i, j))
+            pairs.add((k, l))
+        pairs = sorted(pairs)
+        
+        # init binary alignment vars only for candidate pairs
+        x = {pair: model.add_var(var_type=self.mip.BINARY) for pair in pairs}
+        
+        # init binary match vars for binary structural matches
+        y = {key: model.add_var(var_type=self.mip.BINARY) for key in bx}
+        
+        # set model objective
+        model.objective = self.mip.maximize(
+                self.mip.xsum(ux[pair] * x[pair] for pair in pairs if pair in ux)
+                + self.mip.xsum(bx[key] * y[key] for key in bx))
+        
+        # constraints: every var must be aligned only to one other var (or remain unaligned)
+        # merged vars can be aligned to as many vars as they have members
+        rows = {}
+        cols = {}
+        for (i, j) in pairs:
+            rows.setdefault(i, []).append(x[(i, j)])
+            cols.setdefault(j, []).append(x[(i, j)])
+        for i, xs in rows.items():
+            capacity = capacities[i] if capacities else 1
+            if len(xs) > capacity:
+                model += self.mip.xsum(xs) <= capacity
+        for xs in cols.values():
+            if len(xs) > 1:
+                model += self.mip.xsum(xs) <= 1
+        
+        # binary structural match constraint
+        self._add_linking_constraints(model, lambda i, j: x[(i, j)], y, capacities)
+
+        return model, x
+
+    def _add_linking_constraints(self, model, x, y, capacities=None):
+        """Link structural match vars to alignment vars
+
+            Args:
+                model: the model
+                x (callable): maps (i, j) to alignment var
+                y (dict): structural match vars (i, j, k, l) -> var
+                capacities (list): capacities of (merged) vars of V, None: all 1
+        """
+        
+        if self.linking == "pairwise":
+            for (i, j, k, l), var in y.items():
+                model += var <= x(i, j)
+                model += var <= x(k, l)
+            return None
+        
+        # group struct matches that can't be active together: for one end (i, j) 
+        # all matches whose other end has source k (or target l)
+        groups = {}
+        for (i, j, k, l), var in y.items():
+            ends = [((i, j), (k, l))]
+            if (i, j) != (k, l):
+                ends.append(((k, l), (i, j)))
+            for end, (other_source, other_target) in ends:
+                if capacities and capacities[other_source] > 1:
+                    # a merged var can have more than one target
+                    key = (end, "pair", other_source, other_target)
+                else:
+                    key = (end, "row", other_source)
+                groups.setdefault(key, []).append(var)
+                if self.linking == "aggregated_columns":
+                    groups.setdefault((end, "col", other_target), []).append(var)
+        
+        for key, ys in groups.items():
+            model += self.mip.xsum(ys) <= x(*key[0])
+        return None
+
+    @staticmethod
+    def get_objective_value(model, info):
+        """Objective value of a solved model, in units of the match scores"""
+        
+        if info.objective_scale is None:
+            return model.objective_value
+        return model.objective_value / info.objective_scale
+
+    @staticmethod
+    def get_objective_bound(model, info):
+        """Objective bound of a solved model, in units of the match scores, 
+           rounded down if the objective is integral"""
+        
+        if info.objective_scale is None:
+            return model.objective_bound
+        return math.floor(model.objective_bound + 1e-6) / info.objective_scale
+
+    @staticmethod
+    def get_cutoff(score, info):
+        """Cutoff that discards solutions worse than score, or, with an integral
+           objective, all solutions that are not better than score"""
+        
+        if info.objective_scale is None:
+            return score - 1e-6
+        
+        # better solutions have at least score + 1 / scale, we cut off halfway, 
+        # since CBC doesn't accept solutions that are only just above the cutoff
+        return (score + 0.5 / info.objective_scale) * info.objective_scale
+
+    def get_alignmat(self, x, V, info):
+        """Reads an alignment from the alignment variables of a solved model
+
+            Args:
+                x: alignment variables as returned by build_model
+                V (int): max(nodes V, nodes V')
+                info (MIPModelInfo): as returned by build_model
+
+            Returns:
+                alignmat (array): alignment from V to V', -1 if unaligned
+        """
+        
+        n_rows = len(info.groups) if self.merge_symmetric else V
+        if self.sparse:
+            alignmat = np.zeros((n_rows, V))
+            for (i, j), var in x.items():
+                alignmat[i, j] = var.x
+        else:
+            alignmat = np.array([[x[i][j].x for j in range(V)] for i in range(n_rows)])
+        
+        if not self.merge_symmetric:
+            return util.alignmat_compressed(alignmat)
+        
+        # distribute partners of merged vars over their members
+        merged = alignmat
+        alignmat = -np.ones(V, dtype=int)
+        for g, nodes in enumerate(info.groups):
+            partners = np.argsort(-merged[g], kind="stable")[:len(nodes)]
+            partners = np.sort(partners[merged[g, partners] > 0])
+            alignmat[nodes[:len(partners)]] = partners
+        if info.transposed:
+            alignmat = invert_alignment(alignmat)
+        return alignmat
+    
+    def get_start(self, x, alignmat, info):
+        """Translates an alignment to a starting solution for the model
+
+            Args:
+                x: alignment variables as returned by build_model
+                alignmat (array): alignment from V to V', -1 if unaligned
+                info (MIPModelInfo): as returned by build_model
+
+            Returns:
+                list with (variable, value) tuples
+        """
+        
+        pairs = [(i, j) for i, j in enumerate(alignmat) if j >= 0]
+        if self.merge_symmetric:
+            if info.transposed:
+                pairs = [(j, i) for i, j in pairs]
+            group_of = {node: g for g, nodes in enumerate(info.groups) for node in nodes}
+            pairs = [(group_of[i], j) for i, j in pairs]
+        
+        if self.sparse:
+            return [(x[pair], 1.0) for pair in pairs if pair in x]
+        return [(x[i][j], 1.0) for i, j in pairs]
+
+
+class ILP(interfaces.Solver):
+    """Class that solves alignment problem with ILP
+
+        Attributes:
+            max_seconds (int): time limit
+            warm_start_solver (Solver): if given, its alignment seeds the ILP as a starting
+                                        solution (e.g., a fast hill-climber)
+            use_cutoff (bool): use the objective value of the starting solution
+                               as a cutoff for the search
+            model_factory (MIPModelFactory): builds the model, e.g., 
+                                             MIPModelFactory(sparse=True)
+    """
+
+    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False, 
+                    warm_start_solver=None, use_cutoff=True, model_factory=None):
+        
+        self.model_factory = model_factory
+        if not self.model_factory:
+            self.model_factory = MIPModelFactory()
+        self.max_seconds = max_seconds
+        self.ignore_bad_solution_warning = ignore_bad_solution_warning
+        self.warm_start_solver = warm_start_solver
+        self.use_cutoff = use_cutoff
+        return None
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        start = None
+        if self.warm_start_solver is not None:
+            alignmat, score, _ = self.warm_start_solver.solve(unarymatch_dict, binarymatch_dict, V)
+            logger.debug("warm start alignment with value {} found".format(score))
+            start = (alignmat, score)
+        
+        return self._solve_from_start(unarymatch_dict, binarymatch_dict, V, start)
+
+    def _solve_from_start(self, unarymatch_dict, binarymatch_dict, V, start=None):
+        """Solves the ILP, possibly from a starting solution
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+                start (tuple): None or a starting alignment and its score
+
+            Returns:
+                alignmat, lower bound, upper bound
+        """
+         
+        # get model
+        model, x, info = self.model_factory.build_model(unarymatch_dict, binarymatch_dict, V)
+        
+        # seed model with incumbent, the cutoff lets the solver discard
+        # everything that is worse than the incumbent
+        if start is not None:
+            start_alignmat, start_score = start
+            
+            # with an integral objective the cutoff also discards the incumbent, 
+            # and CBC can return wrong variable values if the start violates the cutoff
+            if not self.use_cutoff or info.objective_scale is None:
+                model.start = self.model_factory.get_start(x, start_alignmat, info)
+            if self.use_cutoff:
+                model.cutoff = self.model_factory.get_cutoff(start_score, info)
+        
+        # optimizing
+        status = model.optimize(relax=False, max_seconds=self.max_seconds)
+        
+        # checking if a solution was found, and return result
+        if model.num_solutions:
+            objective_value = self.model_factory.get_objective_value(model, info)
+            objective_bound = self.model_factory.get_objective_bound(model, info)
+        if model.num_solutions and (start is None or objective_value >= start_score - 1e-6):
+            logger.debug("alignment with value {} found".format(objective_value))
+            alignmat = self.model_factory.get_alignmat(x, V, info)
+            if start is None:
+                return alignmat, objective_value, objective_bound
+            
+            # with a start, CBC may report the value of the start but
+            # return other variable values, so we check the alignment
+            score = util.score(alignmat, unarymatch_dict, binarymatch_dict)
+            if score >= start_score - 1e-6:
+                return alignmat, score, objective_bound
+            return start_alignmat, start_score, max(objective_bound, start_score)
+        
+        # nothing better than the incumbent exists, or time is up
+        if start is not None:
+            bound = 10000000
+            if status == self.model_factory.mip.OptimizationStatus.INFEASIBLE:
+                bound = start_score
+            elif model.num_solutions:
+                bound = objective_bound
+            elif math.isfinite(model.objective_bound):
+                # the cutoff can exclude the incumbent, but the bound is still valid
+                bound = max(self.model_factory.get_objective_bound(model, info), start_score)
+            return start_alignmat, start_score, bound
+
+        if not self.ignore_bad_solution_warning:
+            logger.warning("not one good alignment found in reasonbable time ({} secs), \
+                        consider increasing time limit, using Backup ILP (e.g., ILP + Hillclimber), \
+                        or lossless graph_compression".format(self.max_seconds))
+        
+        dummy_alignmat =  np.zeros((V, V))
+        dummy_alignmat = util.alignmat_compressed(dummy_alignmat)
+        return dummy_alignmat, 0.0, 10000000
+        
+
+class CertifiedILP(interfaces.Solver):
+    """Class that runs a heuristic first and only solves the ILP if the 
+       heuristic solution cannot be certified as optimal with its upper bound
+
+        Attributes:
+            max_seconds (int): time limit of the ILP
+            heuristic (Solver): solver that is run first, it should return 
+                                an upper bound (e.g., the assignment bound)
+            model_factory (MIPModelFactory): builds the ILP model
+    """
+
+    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False, 
+                    heuristic=None, model_factory=None):
+        
+        self.max_seconds = max_seconds
+        
+        self.heuristic = heuristic
+        if not self.heuristic:
+            self.heuristic = VectorizedHillClimber()
+        
+        self.ilp = ILP(max_seconds=max_seconds, ignore_bad_solution_warning=ignore_bad_solution_warning, 
+                        model_factory=model_factory)
+        return None
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        alignmat, score, bound = self.heuristic.solve(unarymatch_dict, binarymatch_dict, V)
+        
+        # heuristic solution is optimal, no need for ILP
+        if score >= bound - 1e-6:
+            logger.debug("heuristic alignment with value {} is certified optimal".format(score))
+            return alignmat, score, bound
+        
+        # else solve ILP with heuristic solution as start
+        logger.debug("heuristic alignment with value {} has upper bound {}, \
+                        solving ILP".format(score, bound))
+        self.ilp.max_seconds = self.max_seconds
+        ilp_alignmat, ilp_score, ilp_bound = self.ilp._solve_from_start(
+                unarymatch_dict, binarymatch_dict, V, (alignmat, score))
+        return ilp_alignmat, ilp_score, min(bound, ilp_bound)
+
+
+class LP(interfaces.Solver):
+    """Class that solves alignment problem with LP (relaxing ILP, possibly leading to 
+       worse solution, but upperbounds are still valid)
+
+        Attributes:
+            max_seconds (int): time limit
+            model_factory (MIPModelFactory): builds the model
+    """
+
+    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False, model_factory=None):
+        
+        self.model_factory = model_factory
+        if not self.model_factory:
+            self.model_factory = MIPModelFactory()
+        self.max_seconds = max_seconds 
+        self.ignore_bad_solution_warning = ignore_bad_solution_warning
+        return None
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+         
+        # get model
+        model, x, info = self.model_factory.build_model(unarymatch_dict, binarymatch_dict, V)
+        
+        # optimizing
+        status = model.optimize(relax=True, max_seconds=self.max_seconds)
+        
+        # checking if a solution was found, and return result
+        if model.num_solutions:
+            logger.debug("alignment with value {} found".format(self.model_factory.get_objective_value(model, info)))
+            alignmat = self.model_factory.get_alignmat(x, V, info)
+            
+            # the objective value model.objective_value is optimistic, probably
+            # so we obtain a more accurate one with (messy) tricks 
+
+            # first we destroy invalid alignments (e.g., two nodes of a aligning with the same (one) node of b)
+            for i, e in enumerate(alignmat):
+                if e >= 0 and e in alignmat[:i]:
+                    alignmat[i] = alignmat[:i].max() + 1
 
             # then we use HillClimber scoring to score this alignment
             wd = Counter()
@@ -499,7 +2760,7 @@ class LP(interfaces.Solver):
                     wd[(a, b)] = Counter()
                 wd[(a, b)][(c, d)] = binarymatch_dict[(a, b, c, d)]
             ov = HillClimber._score(alignmat, unarymatch_dict, wd)
-            return alignmat, ov, model.objective_bound
+            return alignmat, ov, self.model_factory.get_objective_bound(model, info)
         
         if not self.ignore_bad_solution_warning:
             logger.warning("not one good alignment found in reasonbable time ({} secs),\
@@ -520,7 +2781,7 @@ class BackedupILP(interfaces.Solver):
         return None
     
     def _solve(self, unarymatch_dict, binarymatch_dict, V):
-        ilp = ILP(max_seconds=self.max_seconds, ignore_bad_solution_warning=True)
+        ilp = CertifiedILP(max_seconds=self.max_seconds, ignore_bad_solution_warning=True)
         alignmat, score, bound = ilp.solve(unarymatch_dict, binarymatch_dict, V)
         if score == bound:
             return alignmat, score, bound
@@ -536,29 +2797,284 @@ class BackedupILP(interfaces.Solver):
 
 
 
+class HiGHSModelFactory():
+    """Class that builds sparse ILP models for scipy's HiGHS interface (scipy.optimize.milp)
+
+        The model is assembled with numpy from the COO match arrays, without 
+        building expressions one by one. Alignment variables x are only created 
+        for pairs that have unary or binary matches, and every structural match 
+        (i, j, k, l) and its symmetric counterpart share one variable y. 
+        Structural matches that can never be active (i -> j and i -> l with j != l, 
+        or i -> j and k -> j with i != k) are dropped.
+
+        Attributes:
+            linking (string): how structural matches are linked to alignments, 
+                              see MIPModelFactory
+            integral_objective (bool): if True, and all scores are integers after 
+                                       scaling, bounds are rounded down
+    """
+
+    def __init__(self, linking="aggregated_columns", integral_objective=True):
+        if linking not in ("pairwise", "aggregated", "aggregated_columns"):
+            raise ValueError("unknown linking \"{}\"".format(linking))
+        self.linking = linking
+        self.integral_objective = integral_objective
+        return None
+
+    def build_model(self, unarymatch_dict, binarymatch_dict, V):
+        """Builds the model
+
+            Args:
+                unarymatch_dict (dict): scores of unary alignments 
+                binarymatch_dict (dict): scores of binary alignments
+                V (int): max(nodes V, nodes V')
+
+            Returns:
+                tuple with objective (array, to maximize), constraint matrix 
+                (sparse, rows <= upper bounds), upper bounds (array), candidate 
+                pairs (2d array, one row (i, j) per alignment variable) and 
+                scale of the objective (None if not integral)
+        """
+        
+        from scipy.sparse import coo_matrix
+        
+        if unarymatch_dict:
+            unary_idx = np.array(list(unarymatch_dict.keys()), dtype=int).reshape(-1, 2)
+            unary_w = np.array(list(unarymatch_dict.values()), dtype=float)
+        else:
+            unary_idx, unary_w = np.zeros((0, 2), dtype=int), np.zeros(0)
+        i, j, k, l, w = util.binarymatch_arrays(binarymatch_dict)
+        
+        # drop structural matches that can't be active
+        valid = (i == k) == (j == l)
+        i, j, k, l, w = i[valid], j[valid], k[valid], l[valid], w[valid]
+        
+        # one variable for (i, j, k, l) and (k, l, i, j), with (i, j) <= (k, l)
+        first, second = i * V + j, k * V + l
+        swap = first > second
+        first, second = np.where(swap, second, first), np.where(swap, first, second)
+        y_keys, y_idx = np.unique(first * V * V + second, return_inverse=True)
+        y_w = np.bincount(y_idx.reshape(-1), weights=w, minlength=y_keys.shape[0])
+        y_first, y_second = np.divmod(y_keys, V * V)
+        
+        # alignment variables for all pairs with matches
+        pair_codes, x_idx = np.unique(np.concatenate([unary_idx[:, 0] * V + unary_idx[:, 1], y_first, y_second]), 
+                                        return_inverse=True)
+        x_idx = x_idx.reshape(-1)
+        n_x, n_y, n_unary = pair_codes.shape[0], y_keys.shape[0], unary_w.shape[0]
+        x_w = np.bincount(x_idx[:n_unary], weights=unary_w, minlength=n_x)
+        y_first_x = x_idx[n_unary:n_unary + n_y]
+        y_second_x = x_idx[n_unary + n_y:]
+        pairs = np.stack(np.divmod(pair_codes, V), axis=1)
+        
+        objective = np.concatenate([x_w, y_w])
+        scale = None
+        if self.integral_objective:
+            scale = get_integral_scale(objective)
+        
+        # constraints: every var of V and V' is aligned at most once
+        rows = [pairs[:, 0], V + pairs[:, 1]]
+        cols = [np.arange(n_x), np.arange(n_x)]
+        vals = [np.ones(n_x), np.ones(n_x)]
+        n_rows = 2 * V
+        
+        # linking constraints: (sum of) y <= x of one of their ends
+        not_loop = y_first_x != y_second_x
+        ends = np.concatenate([y_first_x, y_second_x[not_loop]])
+        others = np.concatenate([y_second_x, y_first_x[not_loop]])
+        ys = np.concatenate([np.arange(n_y), np.arange(n_y)[not_loop]])
+        if self.linking == "pairwise":
+            group_keys = [np.arange(ends.shape[0])]
+        else:
+            # matches that share an end (i, j), and whose other end has the same 
+            # source k (or target l), can't be active together
+            group_keys = [ends * V + pairs[others, 0]]
+            if self.linking == "aggregated_columns":
+                group_keys.append(ends * V + pairs[others, 1])
+        for keys in group_keys:
+            groups, group_idx = np.unique(keys, return_inverse=True)
+            group_idx = group_idx.reshape(-1) + n_rows
+            group_end = np.zeros(groups.shape[0], dtype=int)
+            group_end[group_idx - n_rows] = ends
+            rows += [group_idx, n_rows + np.arange(groups.shape[0])]
+            cols += [n_x + ys, group_end]
+            vals += [np.ones(ys.shape[0]), -np.ones(groups.shape[0])]
+            n_rows += groups.shape[0]
+        
+        constraints = coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), 
+                                    shape=(n_rows, n_x + n_y)).tocsr()
+        upper = np.concatenate([np.ones(2 * V), np.zeros(n_rows - 2 * V)])
+        return objective, constraints, upper, pairs, scale
+
+    @staticmethod
+    def get_alignmat(solution, pairs, V):
+        """Reads an alignment from the values of the alignment variables"""
+        
+        alignmat = -np.ones(V, dtype=int)
+        selected = pairs[np.asarray(solution[:pairs.shape[0]]) > 0.5]
+        alignmat[selected[:, 0]] = selected[:, 1]
+        return alignmat
+
+    @staticmethod
+    def get_objective_bound(bound, scale):
+        """Upper bound, rounded down if the objective is integral"""
+
+        if scale is None:
+            return bound
+        return math.floor(bound * scale + 1e-6) / scale
+
+
+class HiGHSILP(interfaces.Solver):
+    """Class that solves alignment problems with ILP, using HiGHS via scipy.optimize.milp
+
+        Batches of problems are packed into one block-diagonal model and solved 
+        with one call. Since HiGHS only reports a bound of the whole batch, the 
+        upper bound of a problem is its score plus the gap of the batch.
+
+        Attributes:
+            max_seconds (int): time limit (per batch)
+            model_factory (HiGHSModelFactory): builds the model
+            max_batch_size (int): maximum number of problems in one model
+    """
+
+    def __init__(self, max_seconds=240, ignore_bad_solution_warning=False, model_factory=None, 
+                    max_batch_size=100):
+        
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        self._milp = milp
+        self._LinearConstraint = LinearConstraint
+        self._Bounds = Bounds
+        
+        self.model_factory = model_factory
+        if not self.model_factory:
+            self.model_factory = HiGHSModelFactory()
+        self.max_seconds = max_seconds
+        self.ignore_bad_solution_warning = ignore_bad_solution_warning
+        self.max_batch_size = max_batch_size
+        return None
+
+    def _solve_batch(self, problems):
+        
+        results = []
+        for start in range(0, len(problems), self.max_batch_size):
+            results += self._solve_block_diagonal(problems[start:start + self.max_batch_size])
+        return results
+
+    def _solve_block_diagonal(self, problems):
+        """Solves a batch of problems as one block-diagonal model
+
+            Args:
+                problems (list): (unarymatch_dict, binarymatch_dict, V) tuples
+
+            Returns:
+                list with (alignmat, lower bound, upper bound) per problem
+        """
+        
+        from scipy.sparse import block_diag
+        
+        models = [self.model_factory.build_model(*problem) for problem in problems]
+        sizes = [objective.shape[0] for objective, _, _, _, _ in models]
+        if sum(size > 0 for size in sizes) <= 1:
+            return [self._solve(*problem) for problem in problems]
+        offsets = np.cumsum([0] + sizes)
+        objective = np.concatenate([model[0] for model in models])
+        constraints = block_diag([model[1] for model in models], format="csr")
+        upper = np.concatenate([model[2] for model in models])
+        
+        # the gap must be closed for the whole batch, not relative to it
+        result = self._milp(-objective, 
+                            constraints=self._LinearConstraint(constraints, -np.inf, upper),
+                            integrality=np.ones(objective.shape[0]), 
+                            bounds=self._Bounds(0, 1),
+                            options={"time_limit": self.max_seconds, "mip_rel_gap": 0.0})
+        if result.x is None:
+            logger.debug("no solution for batch of {} problems, solving them one by one".format(len(problems)))
+            return [self._solve(*problem) for problem in problems]
+        
+        alignmats = []
+        scores = []
+        for n, (unarymatch_dict, binarymatch_dict, V) in enumerate(problems):
+            alignmat = self.model_factory.get_alignmat(result.x[offsets[n]:offsets[n + 1]], models[n][3], V)
+            alignmats.append(alignmat)
+            scores.append(util.score_arrays(alignmat, util.unarymatch_array(unarymatch_dict, V), 
+                                            util.binarymatch_arrays(binarymatch_dict)))
+        
+        # every problem is at most as far from its optimum as the batch
+        bound = -result.mip_dual_bound if result.mip_dual_bound is not None else -result.fun
+        gap = max(bound - sum(scores), 0.0)
+        logger.debug("batch of {} problems solved, gap: {}".format(len(problems), gap))
+        results = []
+        for n, (alignmat, score) in enumerate(zip(alignmats, scores)):
+            upper_bound = self.model_factory.get_objective_bound(score + gap, models[n][4])
+            results.append((alignmat, score, max(upper_bound, score)))
+        return results
+
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
+        
+        objective, constraints, upper, pairs, scale = self.model_factory.build_model(
+                unarymatch_dict, binarymatch_dict, V)
+        if not objective.shape[0]:
+            # nothing matches
+            return -np.ones(V, dtype=int), 0.0, 0.0
+        
+        # milp minimizes
+        result = self._milp(-objective, 
+                            constraints=self._LinearConstraint(constraints, -np.inf, upper),
+                            integrality=np.ones(objective.shape[0]), 
+                            bounds=self._Bounds(0, 1),
+                            options={"time_limit": self.max_seconds})
+        
+        if result.x is not None:
+            alignmat = self.model_factory.get_alignmat(result.x, pairs, V)
+            score = util.score_arrays(alignmat, util.unarymatch_array(unarymatch_dict, V), 
+                                        util.binarymatch_arrays(binarymatch_dict))
+            logger.debug("alignment with value {} found".format(score))
+            bound = -result.mip_dual_bound if result.mip_dual_bound is not None else -result.fun
+            bound = self.model_factory.get_objective_bound(bound, scale)
+            return alignmat, score, max(bound, score)
+        
+        if not self.ignore_bad_solution_warning:
+            logger.warning("not one good alignment found in reasonbable time ({} secs), \
+                        consider increasing time limit, using Backup ILP (e.g., ILP + Hillclimber), \
+                        or lossless graph_compression ({})".format(self.max_seconds, result.message))
+        
+        dummy_alignmat =  np.zeros((V, V))
+        dummy_alignmat = util.alignmat_compressed(dummy_alignmat)
+        return dummy_alignmat, 0.0, 10000000
+
+
 ########################################################################
 ########################################################################
-# What follows are experimental relaxed iterative ILP solvers.         #
-# They should provide optimal result in polynomial time or can provide #
-# intermediate solution with upper-bound                               #
+# What follows are relaxed ILP solvers based on Lagrangian decompo-    #
+# sition. The symmetry of structural matches is relaxed, each pair's   #
+# profit can be computed independently and the relaxed problem is a   #
+# linear assignment. They run in polynomial time per iteration and    #
+# provide an intermediate solution with upper-bound at any time.      #
 # c.f. Gunnar W Klau. 2009. A new graph-based method for               #
 # pairwise global network alignment. BMC bioinformatics, 10(1):1–9     #
-# .... Implementation attempts with python don't satisfingly work yet  # 
 ########################################################################
 ########################################################################
 
 class RILP(interfaces.Solver):
+    """Class that solves alignment problems with Lagrangian relaxation
 
-    def __init__(self, max_seconds=15):
-        
-        try:
-            import sparse
-            self.sparse = sparse
-        except ModuleNotFoundError:
-            logger.critical("please install sparse (e.g., 0.13.0) \
-                    for using this class... exiting...")
-            sys.exit(1)
+        The ILP requires that a structural match (i, j, k, l) is used if and 
+        only if (k, l, i, j) is used. We relax this with multipliers that are 
+        antisymmetric, i.e., lmp(i, j, k, l) = -lmp(k, l, i, j). Then, every pair 
+        (i, j) can independently select for each other node k its best partner l, 
+        and the relaxed problem is a linear assignment, whose value is an upper 
+        bound. Multipliers are updated with subgradient steps (Polyak step size).
+
+        Attributes:
+            max_seconds (int): time limit
+            max_iters (int): maximum number of subgradient iterations
+            theta (float): initial step size factor, in (0, 2]
+            patience (int): halve theta if the upper bound didn't improve 
+                            for this many iterations
+    """
 
+    def __init__(self, max_seconds=15, max_iters=1000, theta=2.0, patience=20):
+        
         try:
             from scipy import optimize
             self._optimize = optimize
@@ -568,301 +3084,172 @@ class RILP(interfaces.Solver):
             sys.exit(1)
 
         self.max_seconds = max_seconds
+        self.max_iters = max_iters
+        self.theta = theta
+        self.patience = patience
+        return None
 
-    def _eval_problem(self, candidate_map, ys, unarymatch_dict, binarymatch_dict, lmps=None):
-         
-        su = 0.0
-        sb = 0.0
-        amaxs = np.argmax(candidate_map, axis=1)
-        
-        for i in range(amaxs.shape[0]):
-            j = amaxs[i]
-            su += unarymatch_dict[i, j]     
-        
-        if lmps is not None:
-            sb += (binarymatch_dict * ys + lmps * ys).sum()
-        else:
-            sb += (binarymatch_dict * ys).sum()
-        s = su + sb
-        return s 
-        
+    @staticmethod
+    def _prepare(binary, V):
+        """Precompute index structures over the COO binary scores
 
-    def _dim_reduce_weight(self, i, j, n, binarydata, lmps):
-            
-        keyx = dict()
-        keyy = dict()
-        x = 0
-        y = 0
-        weight_k_l = np.zeros((n,n))
-        for k, l in binarydata[(i, j)].keys():
-            weight_k_l[k, l] = binarydata[(i, j)][(k, l)] + lmps[(i, j, k, l)]
-            
-            if k not in keyx:
-                keyx[k] = x
-                x += 1
-                
-            if l not in keyy:
-                keyy[l] = y
-                y += 1
-            
-        dim = max(x, y)  
-        reduced_weight = np.zeros((dim, dim))
-        for k, l in binarydata[(i, j)].keys():
-            x = keyx[k]
-            y = keyy[l]
-            val = weight_k_l[k, l]
-            reduced_weight[x, y] = val
+            Args:
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
 
-        return reduced_weight, dim
-    
-    def _solve_relaxed_with_max_match(self, n, unarydata, binarydata, lmps):
-         
-        profit_i_j = np.zeros((n, n))
-        lmps = Counter(lmps.asformat("dok").data)
-        
-        co = 0
+            Returns:
+                order (array): permutation that sorts entries by (i, j, k)
+                starts (array): start of each (i, j, k) group in sorted order
+                group (array): group id of every sorted entry
+                pair (array): flat index i * V + j of every group
+                rev (array): index of (k, l, i, j) for every (i, j, k, l), -1 if none
+        """
         
-        for i, j in binarydata.keys():
-             
-            reduced_weight, dim = self._dim_reduce_weight(i, j, n, binarydata, lmps)
-            matchingx = self._optimize.linear_sum_assignment(reduced_weight, maximize=True)
-            _, sum_weightx = self._get_candidate_map_from_matching(matchingx, reduced_weight, dim)
-            profit_i_j[i, j] = sum_weightx        
-            profit_i_j[i, j] += unarydata[(i, j)]       
-            co += 1
+        i, j, k, l, _ = binary
         
-        for i, j in unarydata.keys() - binarydata.keys():
-            profit_i_j[i, j] += unarydata[(i, j)] 
+        # groups of entries that share (i, j, k), only one l can be chosen per group
+        keys = (i * V + j) * V + k
+        order = np.argsort(keys, kind="stable")
+        keys_unique, starts, group = np.unique(keys[order], return_index=True, return_inverse=True)
+        pair = keys_unique // V
         
-        matching = self._optimize.linear_sum_assignment(profit_i_j, maximize=True)
-        cm, sum_weight = self._get_candidate_map_from_matching(matching, profit_i_j, n)
-     
-        candidate_map = cm
+        # index of the reverse entry, their multipliers are coupled
+        code = ((i * V + j) * V + k) * V + l
+        rev_code = ((k * V + l) * V + i) * V + j
+        code_order = np.argsort(code)
+        pos = np.searchsorted(code, rev_code, sorter=code_order)
+        pos = np.minimum(pos, code.shape[0] - 1)
+        rev = code_order[pos]
+        rev[code[rev] != rev_code] = -1
         
-        return candidate_map
+        return order, starts, group.reshape(-1), pair, rev
 
+    def _solve_relaxed(self, unary, binary, V, lmps, prep):
+        """Solve the relaxed problem for given multipliers
 
-    def _complete_struct(self, cm, unarymatch_dict, binarymatch_dict, lmps=None):
-        n = unarymatch_dict.shape[0]
-        
-        ys = self.sparse.DOK((n, n, n, n)).to_coo()
-        if lmps is not None:
-            w = binarymatch_dict + lmps #*lmps
-        else:
-            w = binarymatch_dict.copy()
+            Args:
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
+                lmps (array): multiplier for every binary entry
+                prep (tuple): index structures, as returned by _prepare
+
+            Returns:
+                alignmat (array): alignment of the relaxed problem
+                selected (array): boolean mask, binary entries used in the relaxed problem
+                upper bound (float)
+        """
         
-        marker = w > 0
+        order, starts, group, pair, _ = prep
+        w = binary[4]
+        profits = unary.copy()
+        selected = np.zeros(w.shape[0], dtype=bool)
         
-        ys = self.sparse.where(marker, 1, ys) 
+        if w.shape[0]:
+            # best l for every (i, j, k), only if it has positive profit
+            vals = (w + lmps)[order]
+            best = np.maximum.reduceat(vals, starts)
+            ismax = np.flatnonzero(vals == best[group])
+            _, first = np.unique(group[ismax], return_index=True)
+            argbest = order[ismax[first]]
+            positive = best > 0.0
+            np.add.at(profits.reshape(-1), pair[positive], best[positive])
         
-        if lmps is not None:
-            ys = ys.transpose((2, 3, 0, 1)) * cm 
-            ys = ys.transpose((2, 3, 0, 1)) 
+        rows, cols = self._optimize.linear_sum_assignment(profits, maximize=True)
+        upper_bound = float(profits[rows, cols].sum())
+        alignmat = np.full(V, -1, dtype=int)
+        alignmat[rows] = cols
         
-        if lmps is None:
-            ys = ys.transpose((2, 3, 0, 1)) * cm 
-            ys = ys.transpose((2, 3, 0, 1)) 
-            ys *= cm
+        if w.shape[0]:
+            # entries used in the relaxed solution: best of their group, pair is aligned
+            used = positive & (alignmat[pair // V] == pair % V)
+            selected[argbest[used]] = True
         
-        return ys
-    
-    def _get_candidate_map_from_matching(self, matching, weight_mat, n):
-        sum_weight = 0.0
-        candidate_map = np.zeros((n, n))
-        for n1, n2 in zip(*matching):
-            weight = weight_mat[n1, n2]
-            sum_weight += weight
-            candidate_map[n1, n2] = 1
-        return candidate_map, sum_weight
+        return alignmat, selected, upper_bound
 
-    def _adapt_lmps(self, lmps, ys, stepsize):
-        grad = ys - ys.transpose((2, 3, 0, 1))
-        
-        gnom = (grad * grad).sum()
-        
-        if gnom > 0.000001:
-            stepsize /= gnom
-        
-        newlmps = lmps -  stepsize * grad 
-        
-        return newlmps
+    def _improve(self, alignmat, unary, binary, V):
+        """Turn an alignment of the relaxed problem into a feasible solution
 
-    def _preprocess(self, unarydata, binarydata, V):
-        
-        unarymatch_dict = self.sparse.DOK((V, V), data=unarydata)
-        binarymatch_dict = self.sparse.DOK((V, V, V, V), data=binarydata)
-        
-        wd = Counter()
-    
-        for a, b, c, d in binarydata:
-            if (a,b) not in wd:
-                wd[(a, b)] = Counter()
-            wd[(a, b)][(c, d)] = binarydata[(a, b, c, d)] 
-            
+            Args:
+                alignmat (array): alignment of the relaxed problem
+                unary (2d array): dense unary scores
+                binary (tuple): COO binary scores (i, j, k, l, score)
+                V (int): max(nodes V, nodes V')
 
-        binarydata = wd
-        
-        return unarymatch_dict.to_coo(), binarymatch_dict.to_coo(), binarydata
+            Returns:
+                alignmat (array), score (float)
+        """
+        return alignmat, util.score_arrays(alignmat, unary, binary)
 
-    def _solve(self, unarydata, binarydata, V):
-        
-        # some preprocessing
-        unarymatch_dict, binarymatch_dict, binarydata = self._preprocess(unarydata, binarydata, V)
+    def _solve(self, unarymatch_dict, binarymatch_dict, V):
         
-        alignmat = None
-
-        # intial slack variables
-        lmps = self.sparse.DOK(shape=binarymatch_dict.shape).to_coo()
+        tx = time.time()
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        prep = self._prepare(binary, V)
+        rev = prep[4]
+        paired = rev >= 0
         
-        # set lower and upper bounds
-        lower_bound = 0
-        simple_lower_bound = 0
+        lmps = np.zeros(binary[4].shape[0])
+        alignmat_best = None
+        lower_bound = -1.0
         upper_bound = 10000000
-        
-        # initialize some running numbers
-        iters = 0
-        tx = time.time()
-        improvement = -1
-        MU = 1
-        last_upper_bound_reduce = -1
-        improved_ub = False
+        theta = self.theta
+        last_upper_bound_reduce = 0
+        seen = set()
 
-        # start iterating
-        while True:
-            logger.debug("upper bound: {}".format(upper_bound))
-            logger.debug("lower bound: {}".format(lower_bound))
+        for iters in range(self.max_iters):
             
-            # solve relaxed problem, which gives us an upperbound
-            candidate_map = self._solve_relaxed_with_max_match(V, unarydata, binarydata, lmps=lmps)
-            ysrelax = self._complete_struct(candidate_map, unarymatch_dict, binarymatch_dict, lmps)
-            rv = self._eval_problem(candidate_map, ysrelax, unarymatch_dict, binarymatch_dict, lmps=lmps)
+            alignmat, selected, tmp_upper_bound = self._solve_relaxed(unary, binary, V, lmps, prep)
             
-            if rv < upper_bound:
+            if tmp_upper_bound < upper_bound - 1e-9:
                 # tighten upper-bound
-                upper_bound = rv
+                upper_bound = tmp_upper_bound
                 last_upper_bound_reduce = iters
-                improved_ub = True
-            else:
-                improved_ub = False
-
-            # if no improvement, reduce MU
-            if iters - last_upper_bound_reduce > 50:
-                MU /= 1.8
+            elif iters - last_upper_bound_reduce >= self.patience:
+                # if no improvement, reduce step size
+                theta /= 2.0
                 last_upper_bound_reduce = iters
             
-            # decrease stepsize
-            stepsize = max(MU * (upper_bound - lower_bound), 0.0005)
-
-            # adapt slack variables
-            lmps = self._adapt_lmps(lmps, ysrelax, stepsize)
+            # find a valid solution, we only need to look at new candidates
+            key = alignmat.tobytes()
+            if key not in seen:
+                seen.add(key)
+                alignmat, score = self._improve(alignmat, unary, binary, V)
+                if score > lower_bound:
+                    lower_bound = score
+                    alignmat_best = alignmat
             
-            # find a valid solution
-            ysstrict = self._complete_struct(candidate_map, unarymatch_dict, binarymatch_dict, lmps=None)
-            sv = self._eval_problem(candidate_map, ysstrict, unarymatch_dict, binarymatch_dict)
-
-            # check if valid solution is better than last
+            logger.debug("iteration {}, upper bound: {}, lower bound: {}".format(
+                iters, upper_bound, lower_bound))
             
-            if sv > lower_bound:
-                lower_bound = sv
-                alignmat = candidate_map
-                improvement = iters
-
-            iters += 1
-            if iters == 250:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
-            if upper_bound - lower_bound < 1.0:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
+            if upper_bound - lower_bound < 1e-6:
+                break
             if time.time() - tx > self.max_seconds:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
+                break
+            
+            # subgradient of the symmetry constraints y(i, j, k, l) = y(k, l, i, j)
+            y = selected.astype(float)
+            subgradient = np.zeros_like(y)
+            subgradient[paired] = y[paired] - y[rev[paired]]
+            norm = np.dot(subgradient, subgradient)
+            if norm == 0.0:
+                # relaxed solution is symmetric, hence optimal
+                break
+            stepsize = theta * (tmp_upper_bound - lower_bound) / norm
+            lmps -= stepsize * subgradient
 
-        alignmat = util.alignmat_compressed(alignmat)
-        return alignmat, None, None
+        return alignmat_best, lower_bound, upper_bound
 
 
 class RILPHC(RILP):
+    """Same as RILP, but solutions of the relaxed problem are improved with hill-climbing"""
 
-    def __init__(self, max_seconds=15):
-        RILP.__init__(self)
+    def __init__(self, max_seconds=15, max_iters=1000, theta=2.0, patience=20):
+        RILP.__init__(self, max_seconds=max_seconds, max_iters=max_iters, 
+                        theta=theta, patience=patience)
+        self.hc = VectorizedHillClimber()
+        return None
     
-    def _solve(self, unarydata, binarydata, V):
-        
-        unarymatch_dict, binarymatch_dict, binarydata = self._preprocess(unarydata, binarydata, V)
-        
-        alignmat = None
-        lmps = self.sparse.DOK(shape=binarymatch_dict.shape).to_coo()
-        
-        lower_bound = 0
-        simple_lower_bound = 0
-        upper_bound = 10000000
- 
-        iters = 0
-        tx = time.time()
-        improvement = -1
-        MU = 1
-        last_upper_bound_reduce = -1
-
-        improved_ub = False
-        
-        while True:
-            logger.debug("upper bound: {}".format(upper_bound))
-            logger.debug("lower bound: {}".format(lower_bound))
-            candidate_map = self._solve_relaxed_with_max_match(V, unarydata, binarydata, lmps=lmps)
-            hc = HillClimber()
-            ysrelax = self._complete_struct(candidate_map, unarymatch_dict, binarymatch_dict, lmps)
-            rv = self._eval_problem(candidate_map, ysrelax, unarymatch_dict, binarymatch_dict, lmps=lmps)
-            
-            if rv < upper_bound:
-                upper_bound = rv
-                last_upper_bound_reduce = iters
-                improved_ub = True
-            else:
-                improved_ub = False
-
-             
-            if iters - last_upper_bound_reduce > 50:
-                MU /= 1.8
-                last_upper_bound_reduce = iters
- 
-
-            stepsize = max(MU * (upper_bound - lower_bound), 0.0005)
-
-            lmps = self._adapt_lmps(lmps, ysrelax, stepsize)
-
-            ysstrict = self._complete_struct(candidate_map, unarymatch_dict, binarymatch_dict, lmps=None)
-             
-            sv = self._eval_problem(candidate_map, ysstrict, unarymatch_dict, binarymatch_dict)
-            
-            if sv > simple_lower_bound:
-                
-                simple_lower_bound = sv
-                candidate_map = util.alignmat_compressed(candidate_map.copy())
-                candidate_map, _ , _ = hc._climb(unarydata, binarydata, V, candidate_map)
-                candidate_map = util.alignmat_decompressed(candidate_map)
-                ysstrict = self._complete_struct(candidate_map, unarymatch_dict, binarymatch_dict, lmps=None)
-                sv = self._eval_problem(candidate_map, ysstrict, unarymatch_dict, binarymatch_dict)
-                
-                if sv > lower_bound:
-                    lower_bound = sv
-                    alignmat = candidate_map
-                    improvement = iters
-
-            iters += 1
-            
-            if iters == 250:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
-            if upper_bound - lower_bound < 1.0:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
-            if time.time() - tx > self.max_seconds:
-                alignmat = util.alignmat_compressed(alignmat)
-                return alignmat, lower_bound, upper_bound
-
-        alignmat = util.alignmat_compress(alignmat)
-        return alignmat, None, None
-
-
-
+    def _improve(self, alignmat, unary, binary, V):
+        return self.hc._climb(unary, binary, V, alignmat.copy())
@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 
 logger = logging.getLogger("__main__")
 
@@ -97,6 +98,62 @@ def score(alignmat, unarymatch_dict, binarymatch_dict):
     return sc
 
 
+def unarymatch_array(unarymatch_dict, V):
+    """Convert unary match dict to a dense array
+
+        Args:
+            unarymatch_dict (dict): scores of unary alignments
+            V (int): max(nodes V, nodes V')
+
+        Returns:
+            VxV array with unary scores
+    """
+
+    unary = np.zeros((V, V))
+    if unarymatch_dict:
+        idx = np.array(list(unarymatch_dict.keys()), dtype=int)
+        np.add.at(unary, (idx[:, 0], idx[:, 1]), list(unarymatch_dict.values()))
+    return unary
+
+
+def binarymatch_arrays(binarymatch_dict):
+    """Convert binary match dict to (COO) index arrays
+
+        Args:
+            binarymatch_dict (dict): scores of binary alignments, (i, j, k, l) -> score
+
+        Returns:
+            tuple with five arrays (i, j, k, l, score), one entry per binary match
+    """
+
+    if not binarymatch_dict:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, empty, empty, np.zeros(0)
+    idx = np.array(list(binarymatch_dict.keys()), dtype=int)
+    weights = np.array(list(binarymatch_dict.values()), dtype=float)
+    return idx[:, 0], idx[:, 1], idx[:, 2], idx[:, 3], weights
+
+
+def score_arrays(alignmat, unary, binary):
+    """Score an alignment candidate on array data
+
+        Args:
+            alignmat (array): alignments from V to V', -1 if unaligned
+            unary (2d array): dense unary scores
+            binary (tuple): COO binary scores, as returned by binarymatch_arrays
+
+        Returns:
+            score (float)
+    """
+
+    alignmat = np.asarray(alignmat, dtype=int)
+    aligned = alignmat >= 0
+    sc = unary[np.arange(alignmat.shape[0])[aligned], alignmat[aligned]].sum()
+    i, j, k, l, w = binary
+    sc += w[(alignmat[i] == j) & (alignmat[k] == l)].sum()
+    return float(sc)
+
+
 def alignmat_compressed(alignmat):
     alignmatargmax = alignmat.argmax(axis=1)
     alignmatargmax[alignmat.sum(axis=1) == 0] = -1
@@ -0,0 +1,39 @@
+import random
+from smatchpp import align, score, preprocess
+
+CONCEPTS = ["person", "and", "cat", "dog", "say-01", "want-01", "go-02", "thing"]
+RELATIONS = [":arg0", ":arg1", ":arg2", ":mod", ":op1", ":location"]
+
+
+def random_graph(n, rng, reentrancies=2):
+    """Random graph with n variables: a tree plus some reentrancies"""
+
+    triples = [("ROOT", ":root", "v0")]
+    for i in range(n):
+        triples.append(("v{}".format(i), ":instance", rng.choice(CONCEPTS)))
+        if i > 0:
+            triples.append(("v{}".format(rng.randrange(i)), rng.choice(RELATIONS), "v{}".format(i)))
+    for _ in range(reentrancies):
+        a, b = rng.randrange(n), rng.randrange(n)
+        if a != b:
+            triples.append(("v{}".format(a), rng.choice(RELATIONS), "v{}".format(b)))
+    for i in range(n):
+        if rng.random() < 0.3:
+            triples.append(("v{}".format(i), ":quant", str(rng.randrange(3))))
+    return sorted(set(triples))
+
+
+def random_problem(n1, n2, seed, reentrancies=2):
+    """Alignment problem of two random graphs
+
+        Returns:
+            unarymatch_dict, binarymatch_dict, V
+    """
+
+    rng = random.Random(seed)
+    graph1 = random_graph(n1, rng, reentrancies)
+    graph2 = random_graph(n2, rng, reentrancies)
+    graph1, graph2, var1, var2 = preprocess.BasicGraphPairPreparer().prepare_get_vars(graph1, graph2)
+    aligner = align.GraphAligner(score.IDTripleMatcher(), None)
+    _, unarymatch_dict, binarymatch_dict, V = aligner._make_problem(graph1, graph2, var1, var2)
+    return unarymatch_dict, binarymatch_dict, V
@@ -0,0 +1,17 @@
+from smatchpp import solvers, util
+from problems import random_problem
+
+
+def test_batch_matches_single():
+    problems = [random_problem(6, 7, seed) for seed in range(8)]
+    solver = solvers.HiGHSILP()
+    results = solver.solve_batch(problems)
+    assert len(results) == len(problems)
+    for (unarymatch_dict, binarymatch_dict, V), (alignmat, lower_bound, upper_bound) in zip(problems, results):
+        _, optimum, _ = solvers.EnumerationSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        _, single_lower_bound, single_upper_bound = solver.solve(unarymatch_dict, binarymatch_dict, V)
+        assert lower_bound == util.score(alignmat, unarymatch_dict, binarymatch_dict)
+        assert abs(lower_bound - single_lower_bound) < 1e-6
+        assert abs(lower_bound - optimum) < 1e-6
+        assert abs(upper_bound - single_upper_bound) < 1e-6
+        assert upper_bound >= optimum - 1e-6
@@ -0,0 +1,73 @@
+import numpy as np
+from collections import Counter
+from smatchpp import solvers, util
+from problems import random_problem
+
+
+def score_gains(alignmat, unarymatch_dict, binarymatch_dict):
+    """Gains of all switches (i, k), k < i, as differences of util.score"""
+
+    V = alignmat.shape[0]
+    score = util.score(alignmat, unarymatch_dict, binarymatch_dict)
+    gains = np.zeros((V, V))
+    for i in range(V):
+        for k in range(i):
+            switched = alignmat.copy()
+            switched[[i, k]] = switched[[k, i]]
+            gains[i, k] = util.score(switched, unarymatch_dict, binarymatch_dict) - score
+    return gains
+
+
+def test_vectorized_swap_gains():
+    for seed in range(5):
+        unarymatch_dict, binarymatch_dict, V = random_problem(7, 8, seed)
+        unary = util.unarymatch_array(unarymatch_dict, V)
+        binary = util.binarymatch_arrays(binarymatch_dict)
+        rng = np.random.default_rng(seed)
+        alignmat = rng.permutation(V)
+        for _ in range(10):
+            gains = solvers.VectorizedHillClimber._swap_gains(alignmat, unary, binary)
+            expected = score_gains(alignmat, unarymatch_dict, binarymatch_dict)
+            assert np.allclose(np.tril(gains), expected)
+            assert np.allclose(gains, gains.T)
+            i, k = rng.choice(V, 2, replace=False)
+            alignmat[[i, k]] = alignmat[[k, i]]
+
+
+class CheckedHillClimber(solvers.HillClimber):
+    """Hill-climber that checks its gain table after every update"""
+
+    def __init__(self, unarymatch_dict, binarymatch_dict):
+        solvers.HillClimber.__init__(self, incremental=True)
+        self.unarymatch_dict = unarymatch_dict
+        self.binarymatch_dict = binarymatch_dict
+        self.checks = 0
+
+    def _update_gains(self, gains, alignmat, inverse, *args):
+        solvers.HillClimber._update_gains(self, gains, alignmat, inverse, *args)
+        assert np.argsort(alignmat).tolist() == inverse
+        expected = score_gains(np.array(alignmat), self.unarymatch_dict, self.binarymatch_dict)
+        # switches that can't gain anything may keep an outdated gain <= 0
+        assert np.allclose(np.maximum(gains, 0.0), np.maximum(expected, 0.0))
+        self.checks += 1
+
+
+def test_incremental_gains():
+    for seed in range(5):
+        unarymatch_dict, binarymatch_dict, V = random_problem(7, 8, seed)
+        wd = Counter()
+        for a, b, c, d in binarymatch_dict:
+            wd.setdefault((a, b), Counter())[(c, d)] = binarymatch_dict[(a, b, c, d)]
+        hc = CheckedHillClimber(unarymatch_dict, binarymatch_dict)
+        alignmat = np.random.default_rng(seed).permutation(V)
+        alignmat, score, _ = hc._climb_incremental(unarymatch_dict, wd, V, alignmat)
+        assert hc.checks > 1
+        assert score == util.score(alignmat, unarymatch_dict, binarymatch_dict)
+
+
+def test_seeded_solvers_are_reproducible():
+    unarymatch_dict, binarymatch_dict, V = random_problem(12, 13, 0)
+    for name in ["hillclimber", "hillclimber_vectorized", "tabu"]:
+        alignmats = [solvers.get_solver(name, seed=7).solve(unarymatch_dict, binarymatch_dict, V)[0] 
+                        for _ in range(2)]
+        assert np.array_equal(alignmats[0], alignmats[1])
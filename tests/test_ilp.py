@@ -0,0 +1,38 @@
+import numpy as np
+from smatchpp import solvers, util
+from problems import random_problem
+
+
+def test_integral_cutoff_certifies_optimal_start():
+    # the start is optimal, so nothing survives the cutoff
+    for seed in range(5):
+        unarymatch_dict, binarymatch_dict, V = random_problem(6, 7, seed)
+        alignmat, optimum, _ = solvers.EnumerationSolver().solve(unarymatch_dict, binarymatch_dict, V)
+
+        factory = solvers.MIPModelFactory(integral_objective=True)
+        model, x, info = factory.build_model(unarymatch_dict, binarymatch_dict, V)
+        assert info.objective_scale is not None
+        model.cutoff = factory.get_cutoff(optimum, info)
+        status = model.optimize(relax=False)
+        assert status == factory.mip.OptimizationStatus.INFEASIBLE
+
+        ilp = solvers.ILP(model_factory=factory)
+        result, lower_bound, upper_bound = ilp._solve_from_start(unarymatch_dict, binarymatch_dict, V,
+                                                                 (alignmat, optimum))
+        assert lower_bound == upper_bound == optimum
+        assert util.score(result, unarymatch_dict, binarymatch_dict) == optimum
+
+
+def test_integral_cutoff_finds_better_solution():
+    for seed in range(5):
+        unarymatch_dict, binarymatch_dict, V = random_problem(6, 7, seed)
+        _, optimum, _ = solvers.EnumerationSolver().solve(unarymatch_dict, binarymatch_dict, V)
+
+        # an empty alignment as start, which is worse than the optimum
+        start = -np.ones(V, dtype=int)
+        factory = solvers.MIPModelFactory(integral_objective=True)
+        ilp = solvers.ILP(model_factory=factory)
+        result, lower_bound, upper_bound = ilp._solve_from_start(unarymatch_dict, binarymatch_dict, V,
+                                                                 (start, 0.0))
+        assert lower_bound == upper_bound == optimum
+        assert util.score(result, unarymatch_dict, binarymatch_dict) == optimum
@@ -0,0 +1,42 @@
+import random
+import numpy as np
+from smatchpp import align, interning, preprocess, score, solvers
+from problems import random_graph
+
+
+def score_pair(triples1, triples2, lossless_graph_compression):
+    preparer = preprocess.BasicGraphPairPreparer(lossless_graph_compression=lossless_graph_compression)
+    graph1, graph2, var1, var2 = preparer.prepare_get_vars(triples1, triples2)
+    aligner = align.GraphAligner(score.IDTripleMatcher(), solvers.EnumerationSolver())
+    alignment, varindex, status = aligner.align(graph1, graph2, var1, var2)
+    match = score.TripleScorer(score.IDTripleMatcher()).score(graph1, graph2, alignment, varindex)
+    return match, status
+
+
+def score_pair_interned(triples1, triples2, lossless_graph_compression):
+    symbol_table = interning.SymbolTable()
+    preparer = interning.InternedGraphPairPreparer(symbol_table, lossless_graph_compression=lossless_graph_compression)
+    graph1 = interning.intern_graph(triples1, symbol_table)
+    graph2 = interning.intern_graph(triples2, symbol_table)
+    graph1, graph2 = preparer.prepare(graph1, graph2)
+    # as in Smatchpp.process_pair
+    alignment, status = np.array([]), (0, 0)
+    if graph1.variables.shape[0] and graph2.variables.shape[0]:
+        unarymatch_dict, binarymatch_dict, V = interning.get_match_dicts(graph1, graph2)
+        alignment, lower_bound, upper_bound = solvers.EnumerationSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        status = (lower_bound, upper_bound)
+    match = interning.score_alignment(graph1, graph2, alignment)
+    return match, status
+
+
+def test_interned_matches_basic():
+    rng = random.Random(0)
+    for _ in range(20):
+        triples1 = random_graph(rng.randint(1, 7), rng)
+        triples2 = random_graph(rng.randint(1, 7), rng)
+        for lossless_graph_compression in [False, True]:
+            match, status = score_pair(triples1, triples2, lossless_graph_compression)
+            match_interned, status_interned = score_pair_interned(triples1, triples2, lossless_graph_compression)
+            assert np.array_equal(match, match_interned)
+            if status_interned != (0, 0):
+                assert status[0] == status_interned[0]
@@ -0,0 +1,13 @@
+from smatchpp import solvers, util
+from problems import random_problem
+
+
+def test_pruning_bounds():
+    for seed in range(8):
+        unarymatch_dict, binarymatch_dict, V = random_problem(6, 7, seed)
+        _, optimum, _ = solvers.EnumerationSolver().solve(unarymatch_dict, binarymatch_dict, V)
+        for k in [1, 2, 3]:
+            alignmat, lower_bound, upper_bound = solvers.PruningSolver(k=k).solve(unarymatch_dict, binarymatch_dict, V)
+            assert lower_bound == util.score(alignmat, unarymatch_dict, binarymatch_dict)
+            assert lower_bound <= optimum + 1e-6
+            assert upper_bound >= optimum - 1e-6